@@ -0,0 +1,164 @@
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Measures summed per (Condition, Gender, Age, Drug) cell
+MEASURES = ['Recovery Rate', 'Treatment Duration (days)', 'Dosage (mg)']
+DRUG_KEYS = ['Condition', 'Gender', 'Age', 'Drug']
+SIDE_EFFECT_KEYS = ['Condition', 'Gender', 'Age', 'Side Effects']
+# Columns a backend has to scan to build the cube
+CUBE_COLUMNS = DRUG_KEYS + ['Side Effects'] + MEASURES
+# Dimensions listed in the source file's order (the Drug axis is sorted)
+LEVEL_COLUMNS = ['Condition', 'Gender', 'Side Effects']
+
+_cubes = {}
+_lock = threading.Lock()
+
+
+def _levels(series, order=None):
+    # First-appearance order, the same order the sidebar selectboxes always used. Backends
+    # that don't scan the file front to back pass that order in; unknown values go last.
+    levels = list(pd.unique(series))
+    if not order:
+        return levels
+    present, known = set(levels), set(order)
+    return [value for value in order if value in present] + [value for value in levels if value not in known]
+
+
+def _positions(levels, value):
+    # None means no filter on that dimension
+    if value is None:
+        return np.arange(len(levels))
+    return np.array([levels.index(value)] if value in levels else [], dtype=np.intp)
+
+
+class CubeSlice:
+    def __init__(self, cube, counts, sums, side_effects):
+        self.cube = cube
+        self.drug_counts = counts
+        self.drug_sums = sums
+        self.side_effect_counts_by_level = side_effects
+        self.count = int(counts.sum())
+
+    @property
+    def empty(self):
+        return self.count == 0
+
+    def mean(self, measure):
+        return self.drug_sums[measure].sum() / self.count if self.count else math.nan
+
+    def drug_recovery(self):
+        # Same frame as filtered_df.groupby('Drug')['Recovery Rate'].mean().reset_index()
+        present = self.drug_counts > 0
+        drugs = np.array(self.cube.drugs, dtype=object)[present]
+        means = self.drug_sums['Recovery Rate'][present] / self.drug_counts[present]
+        return pd.DataFrame({'Drug': drugs, 'Recovery Rate': means}).sort_values('Drug', ignore_index=True)
+
+    def side_effect_counts(self):
+        # Same frame as filtered_df['Side Effects'].value_counts().reset_index()
+        counts = pd.Series(self.side_effect_counts_by_level, index=pd.Index(self.cube.side_effects, name='Side Effects'), name='count')
+        return counts[counts > 0].sort_values(ascending=False, kind='stable').reset_index()
+
+
+def cells(frame):
+    # Per-cell counts and measure sums for one frame (or batch) of complete rows
+    frame = frame.assign(Age=frame['Age'].to_numpy(dtype=np.int64))
+    grouped = frame.groupby(DRUG_KEYS, sort=False, observed=True)
+    drug_cells = grouped[MEASURES].sum()
+    drug_cells['count'] = grouped.size()
+    side_cells = frame.groupby(SIDE_EFFECT_KEYS, sort=False, observed=True).size().rename('count')
+    return drug_cells.reset_index(), side_cells.reset_index()
+
+
+def merge_cells(parts):
+    # Combine cells from several batches; first-appearance order is kept
+    parts = list(parts)
+    drug_cells = pd.concat([drug for drug, _ in parts], ignore_index=True)
+    side_cells = pd.concat([side for _, side in parts], ignore_index=True)
+    return (
+        drug_cells.groupby(DRUG_KEYS, sort=False, observed=True).sum().reset_index(),
+        side_cells.groupby(SIDE_EFFECT_KEYS, sort=False, observed=True).sum().reset_index(),
+    )
+
+
+class Cube:
+    def __init__(self, drug_cells, side_cells, version, order=None):
+        # order: {column in LEVEL_COLUMNS: values in source file order}, see _levels
+        order = order or {}
+        self.version = version
+        # Kept so appended rows can be merged in without rescanning the data
+        self.cells = (drug_cells, side_cells)
+        self.conditions = _levels(drug_cells['Condition'], order.get('Condition'))
+        self.genders = _levels(drug_cells['Gender'], order.get('Gender'))
+        self.drugs = sorted(pd.unique(drug_cells['Drug']))
+        self.side_effects = _levels(side_cells['Side Effects'], order.get('Side Effects'))
+        ages = drug_cells['Age'].to_numpy(dtype=np.int64)
+        self.age_min = int(ages.min()) if len(ages) else 0
+        self.age_max = int(ages.max()) if len(ages) else 0
+        shape = (len(self.conditions), len(self.genders), self.age_max - self.age_min + 1)
+
+        def accumulate(cells, column, levels, weights):
+            position = np.ravel_multi_index((
+                pd.Categorical(cells['Condition'], categories=self.conditions).codes,
+                pd.Categorical(cells['Gender'], categories=self.genders).codes,
+                cells['Age'].to_numpy(dtype=np.int64) - self.age_min,
+            ), shape)
+            width = len(levels)
+            index = position * width + pd.Categorical(cells[column], categories=levels).codes
+            flat = np.bincount(index, weights=weights.to_numpy(dtype=np.float64), minlength=math.prod(shape) * width)
+            # Prefix sums over Age: slot k holds everything below age_min + k
+            table = flat.reshape(shape + (width,))
+            return np.concatenate([np.zeros(shape[:2] + (1, width)), table.cumsum(axis=2)], axis=2)
+
+        def accumulate_counts(cells, column, levels):
+            return np.rint(accumulate(cells, column, levels, cells['count'])).astype(np.int64)
+
+        self.counts = accumulate_counts(drug_cells, 'Drug', self.drugs)
+        self.sums = {m: accumulate(drug_cells, 'Drug', self.drugs, drug_cells[m]) for m in MEASURES}
+        self.side_effect_table = accumulate_counts(side_cells, 'Side Effects', self.side_effects)
+
+    @classmethod
+    def from_frame(cls, frame, version):
+        return cls(*cells(frame), version)
+
+    def extend(self, frame, version):
+        # Cube for this one's rows plus the complete rows in `frame`
+        order = {'Condition': self.conditions, 'Gender': self.genders, 'Side Effects': self.side_effects}
+        return Cube(*merge_cells([self.cells, cells(frame)]), version, order)
+
+    def _age_bounds(self, age_range):
+        # Ages are whole years, so a range covers ceil(low)..floor(high)
+        span = self.age_max - self.age_min + 1
+        low = min(max(math.ceil(age_range[0]) - self.age_min, 0), span)
+        high = min(max(math.floor(age_range[1]) - self.age_min + 1, 0), span)
+        return low, max(high, low)
+
+    def query(self, age_range, gender=None, condition=None):
+        low, high = self._age_bounds(age_range)
+        cells = np.ix_(_positions(self.conditions, condition), _positions(self.genders, gender))
+
+        def total(table):
+            block = table[cells]
+            return (block[:, :, high] - block[:, :, low]).sum(axis=(0, 1))
+
+        return CubeSlice(self, total(self.counts), {m: total(t) for m, t in self.sums.items()}, total(self.side_effect_table))
+
+
+def get_cube(dataset):
+    # Built once per data version and shared by every session
+    cube = _cubes.get(dataset.path)
+    if cube is not None and cube.version == dataset.version:
+        return cube
+    with _lock:
+        cube = _cubes.get(dataset.path)
+        if cube is None or cube.version != dataset.version:
+            if cube is not None and cube.version == getattr(dataset, 'previous_version', None):
+                # Rows were only appended: fold them into the previous cube's cells
+                cube = cube.extend(dataset.appended_clean[CUBE_COLUMNS], dataset.version)
+            else:
+                batches = dataset.complete_batches(CUBE_COLUMNS)
+                cube = Cube(*merge_cells(cells(batch) for batch in batches), dataset.version, getattr(dataset, 'level_order', None))
+            _cubes[dataset.path] = cube
+    return cube
@@ -0,0 +1,149 @@
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+
+import config
+import db_pool
+import store
+from backends import append_parquet
+from data_loader import HASH_BLOCK_SIZE, load_dataset
+from store import COLUMNS, SCHEMA
+
+TEXT_COLUMNS = [name for name, kind in SCHEMA if kind == 'TEXT']
+
+logger = logging.getLogger(__name__)
+
+# One append at a time per process; run a single appender (or watcher) per data file
+_lock = threading.Lock()
+
+
+def read_batch(path):
+    # (values, text): typed rows for the store and the exact field text for the CSV.
+    # Raises ValueError when the batch doesn't match the dataset schema.
+    text = pd.read_csv(path, dtype=str, keep_default_na=False)
+    missing = [name for name in COLUMNS if name not in text.columns]
+    unexpected = [name for name in text.columns if name not in COLUMNS]
+    if missing or unexpected:
+        raise ValueError(f'{path}: missing columns {missing}, unexpected columns {unexpected}')
+    values = pd.read_csv(path, dtype=dict.fromkeys(TEXT_COLUMNS, str))
+    for name, kind in SCHEMA:
+        if kind == 'TEXT':
+            continue
+        numbers = pd.to_numeric(values[name], errors='coerce')
+        invalid = numbers.isna() & values[name].notna()
+        if kind == 'INTEGER':
+            invalid |= numbers.notna() & (numbers % 1 != 0)
+        if invalid.any():
+            raise ValueError(f'{path}: row {int(invalid.to_numpy().argmax()) + 1} has an invalid {name!r} value')
+        values[name] = numbers.astype('float64')
+    return values[COLUMNS], text[COLUMNS]
+
+
+def _scan(path):
+    # Running hash of the data file plus how its lines end, so new rows match them
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        terminator = '\r\n' if f.readline().endswith(b'\r\n') else '\n'
+        f.seek(0)
+        last = b''
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            last = block[-1:]
+    return digest, terminator, last in (b'\n', b'')
+
+
+def append_batch(path, data_file=config.DATA_FILE, db_path=store.DB_FILE, parquet_dir=config.PARQUET_DIR):
+    # Validate, drop PatientIDs already in the dataset (or repeated in the batch), then append
+    # to the CSV, the store and, when it exists, the Parquet copy. Returns the rows added.
+    values, text = read_batch(path)
+    with _lock:
+        digest, terminator, ends_with_newline = _scan(data_file)
+        previous_version = digest.hexdigest()
+        pool = db_pool.get_pool(db_path)
+        with pool.writer() as conn:
+            store.migrate(conn)
+            current = store.stored_version(conn)
+        # The store is the PatientID index, so it has to hold the current file first
+        if current != previous_version:
+            store.ensure_store(load_dataset(data_file), db_path)
+
+        ids = values['PatientID']
+        with pool.reader() as conn:
+            known = store.existing_patient_ids(conn, ids.dropna().unique())
+        keep = (ids.isna() | (~ids.duplicated() & ~ids.isin(known))).to_numpy()
+        values, text = values[keep], text[keep]
+        if not len(values):
+            logger.info("%s: no new rows", path)
+            return 0
+
+        data = text.to_csv(index=False, header=False, lineterminator=terminator).encode('utf-8')
+        if not ends_with_newline:
+            data = terminator.encode('utf-8') + data
+        with open(data_file, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        digest.update(data)
+        version = digest.hexdigest()
+
+        with pool.writer() as conn:
+            stored = store.append(conn, values, previous_version, version)
+        if not stored:
+            # The store no longer holds the file this batch extended: rebuild it from the file
+            logger.warning("%s: store is not at version %s, resyncing it from %s", path, previous_version[:12], data_file)
+            store.ensure_store(load_dataset(data_file), db_path)
+        if os.path.isdir(parquet_dir):
+            append_parquet(values, parquet_dir, version)
+    logger.info("%s: appended %d rows (%d duplicates skipped), version %s", path, len(values), int((~keep).sum()), version[:12])
+    return len(values)
+
+
+def watch(directory, interval=5.0, **targets):
+    # Appends every .csv moved into directory (write batches elsewhere, then move them in),
+    # then files it under done/, or under rejected/ next to a .error file with the reason
+    for name in ('done', 'rejected'):
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+    while True:
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not name.endswith('.csv') or not os.path.isfile(path):
+                continue
+            stamped = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}"
+            try:
+                append_batch(path, **targets)
+            except ValueError as error:
+                logger.warning("rejected %s: %s", path, error)
+                shutil.move(path, os.path.join(directory, 'rejected', stamped))
+                with open(os.path.join(directory, 'rejected', f'{stamped}.error'), 'w') as f:
+                    f.write(f'{error}\n')
+                continue
+            shutil.move(path, os.path.join(directory, 'done', stamped))
+        time.sleep(interval)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Append new patient records to the dataset and its SQLite and Parquet copies.')
+    parser.add_argument('batches', nargs='*', help='CSV files with the dataset columns')
+    parser.add_argument('--watch', metavar='DIR', help='keep appending CSV files dropped into DIR')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between drop directory scans')
+    parser.add_argument('--data', default=config.DATA_FILE)
+    parser.add_argument('--db', default=store.DB_FILE)
+    parser.add_argument('--parquet-dir', default=config.PARQUET_DIR, help='also appended to when the directory exists')
+    args = parser.parse_args()
+    if not args.batches and not args.watch:
+        parser.error('give batch files or --watch DIR')
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    targets = {'data_file': args.data, 'db_path': args.db, 'parquet_dir': args.parquet_dir}
+    for batch in args.batches:
+        append_batch(batch, **targets)
+    if args.watch:
+        watch(args.watch, args.interval, **targets)
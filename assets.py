@@ -0,0 +1,104 @@
+import hashlib
+import io
+import logging
+import os
+import sys
+import threading
+
+import config
+from catalog import file_signature
+from lru import LRUCache
+
+FORMAT = 'webp'
+
+logger = logging.getLogger(__name__)
+
+# Encoded variants shared by every session, keyed by source content hash, width and quality
+_variants = LRUCache(config.IMAGE_CACHE_ENTRIES, config.IMAGE_CACHE_MB * 1024 * 1024)
+# path -> (file signature, content hash), so reruns don't re-read the source image
+_digests = {}
+_lock = threading.Lock()
+
+
+def available():
+    try:
+        from PIL import features
+    except ImportError:
+        return False
+    return features.check('webp')
+
+
+def content_hash(path):
+    signature = file_signature(path)
+    cached = _digests.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    with _lock:
+        _digests[path] = (signature, digest)
+    return digest
+
+
+def _encode(path, width, quality):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        # Never upscale; the browser only ever shows it at the content column width
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, format=FORMAT, quality=quality, method=6)
+    return out.getvalue()
+
+
+def variant_path(digest, width, quality):
+    return os.path.join(config.CACHE_DIR, 'images', f'{digest[:24]}-{width}-q{quality}.{FORMAT}')
+
+
+def image(path, width=None, quality=None):
+    # Resized WebP bytes for st.image, or the original path when that is smaller or
+    # Pillow can't write WebP. Memory first, then the disk cache, then encode once.
+    width = width or config.IMAGE_WIDTH
+    quality = quality or config.IMAGE_QUALITY
+    if not available():
+        return path
+    digest = content_hash(path)
+    key = (digest, width, quality)
+    data = _variants.get(key)
+    if data is not None:
+        return data if data else path
+    cached = variant_path(digest, width, quality)
+    if os.path.exists(cached):
+        with open(cached, 'rb') as f:
+            data = f.read()
+    else:
+        data = _encode(path, width, quality)
+        # An empty marker means the original was already smaller
+        if len(data) >= os.path.getsize(path):
+            data = b''
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        partial = f'{cached}.{threading.get_ident()}.tmp'
+        with open(partial, 'wb') as f:
+            f.write(data)
+        os.replace(partial, cached)
+        logger.info("encoded %s at %dpx: %d -> %d bytes", path, width, os.path.getsize(path), len(data) or os.path.getsize(path))
+    _variants.put(key, data)
+    return data if data else path
+
+
+def cache_stats():
+    return _variants.stats()
+
+
+if __name__ == '__main__':
+    # python assets.py [image ...]   pre-build the variants (default: every image in the content registry)
+    import content
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    paths = sys.argv[1:] or content.image_paths()
+    for path in paths:
+        image(path)
@@ -0,0 +1,161 @@
+import base64
+import csv
+import getpass
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import db_pool
+from catalog import file_signature
+
+CREDENTIALS_FILE = 'credential_database.csv'
+CREDENTIALS_DB = 'credential_database.db'
+HASH_SCHEME = 'pbkdf2_sha256'
+
+logger = logging.getLogger(__name__)
+
+# Process-wide user index, rebuilt only when the credential file changes
+_users = {'signature': None, 'hashes': {}, 'dummy': None}
+_lock = threading.Lock()
+# PBKDF2 releases the GIL, so verification in this pool doesn't stall other sessions
+_executor = ThreadPoolExecutor(max_workers=config.AUTH_WORKERS, thread_name_prefix='auth')
+# Tokens are signed with this key; set DASHBOARD_AUTH_SECRET to share it between replicas
+_secret = (config.AUTH_SECRET or secrets.token_hex(32)).encode('utf-8')
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def hash_password(password, iterations=None, salt=None):
+    iterations = iterations or config.AUTH_ITERATIONS
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f'{HASH_SCHEME}${iterations}${_b64(salt)}${_b64(digest)}'
+
+
+def check_password(password, encoded):
+    scheme, iterations, salt, digest = encoded.split('$')
+    if scheme != HASH_SCHEME:
+        raise ValueError(f'Unsupported password hash scheme {scheme!r}')
+    candidate = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), _unb64(salt), int(iterations))
+    return hmac.compare_digest(candidate, _unb64(digest))
+
+
+def read_credentials(path=CREDENTIALS_FILE):
+    # username -> encoded hash; a legacy plaintext 'password' column is hashed on load
+    hashes = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        plaintext = 'password_hash' not in (reader.fieldnames or [])
+        for row in reader:
+            hashes[row['username']] = hash_password(row['password']) if plaintext else row['password_hash']
+    if plaintext and hashes:
+        logger.warning("%s stores plaintext passwords; run 'python auth.py hash-csv' to hash them", path)
+    return hashes
+
+
+def _sync_db(hashes, db_path=CREDENTIALS_DB):
+    # Indexed copy of the hashes for other tools; rewritten only when the source changes
+    with db_pool.writer(db_path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DROP TABLE IF EXISTS users")
+            conn.execute("DROP TABLE IF EXISTS credential_database")
+            conn.execute("CREATE TABLE credential_database (username TEXT PRIMARY KEY, password_hash TEXT NOT NULL)")
+            conn.executemany("INSERT INTO credential_database VALUES (?, ?)", sorted(hashes.items()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        # Don't leave old rows (e.g. plaintext passwords) behind in free pages or the WAL
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def load_users(path=CREDENTIALS_FILE):
+    signature = file_signature(path)
+    if _users['signature'] == signature:
+        return _users['hashes']
+    with _lock:
+        if _users['signature'] != signature:
+            hashes = read_credentials(path)
+            _sync_db(hashes)
+            _users['hashes'] = hashes
+            _users['signature'] = signature
+            logger.info("loaded %d users from %s", len(hashes), path)
+    return _users['hashes']
+
+
+def verify(username, password):
+    encoded = load_users().get(username)
+    if encoded is None:
+        # Unknown users still pay for one hash, so timing doesn't reveal who exists
+        if _users.get('dummy') is None:
+            _users['dummy'] = hash_password(secrets.token_hex(8))
+        check_password(password, _users['dummy'])
+        return False
+    return check_password(password, encoded)
+
+
+def verify_async(username, password):
+    # Future resolving to True/False, computed on the auth worker pool
+    return _executor.submit(verify, username, password)
+
+
+def issue_token(username):
+    payload = f'{username}|{int(time.time()) + config.AUTH_TOKEN_SECONDS}'
+    signature = hmac.new(_secret, payload.encode('utf-8'), hashlib.sha256).digest()
+    return f'{_b64(payload.encode("utf-8"))}.{_b64(signature)}'
+
+
+def token_user(token):
+    # Username for a valid, unexpired token whose user still exists, else None
+    if not token:
+        return None
+    try:
+        payload, signature = token.split('.')
+        payload = _unb64(payload)
+        expected = hmac.new(_secret, payload, hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _unb64(signature)):
+            return None
+        username, expires = payload.decode('utf-8').rsplit('|', 1)
+    except ValueError:
+        return None
+    if int(expires) < time.time() or username not in load_users():
+        return None
+    return username
+
+
+def write_credentials(hashes, path=CREDENTIALS_FILE):
+    partial = f'{path}.tmp'
+    with open(partial, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['username', 'password_hash'])
+        writer.writerows(sorted(hashes.items()))
+    os.replace(partial, path)
+
+
+if __name__ == '__main__':
+    # python auth.py hash-csv            rewrite plaintext passwords as salted hashes
+    # python auth.py add-user <name>     add or reset a user (prompts for the password)
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    if command == 'hash-csv':
+        write_credentials(read_credentials())
+    elif command == 'add-user' and len(sys.argv) > 2:
+        users = read_credentials()
+        users[sys.argv[2]] = hash_password(getpass.getpass('Password: '))
+        write_credentials(users)
+    else:
+        sys.exit('usage: python auth.py hash-csv | add-user <name>')
@@ -0,0 +1,192 @@
+import json
+import os
+import shutil
+import sys
+import threading
+
+import pandas as pd
+
+import config
+from aggregates import LEVEL_COLUMNS
+from catalog import directory_signature
+from data_loader import INTEGRAL_COLUMNS, TEXT_DTYPE, load_dataset
+from instrumentation import stage
+from store import COLUMNS, SCHEMA, ensure_store
+
+# Sidecar with the dtypes pd.read_csv gave the source and the order its levels first
+# appear in (partitions are read in directory order); '_' files are skipped by Arrow
+META_FILE = '_dataset_meta.json'
+
+_parquet_datasets = {}
+_lock = threading.Lock()
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    types = {'TEXT': pa.string(), 'INTEGER': pa.int16(), 'REAL': pa.float64()}
+    return pa.schema([(name, types[kind]) for name, kind in SCHEMA] + [('complete', pa.bool_())])
+
+
+class ParquetDataset:
+    # Partitioned Parquet files read through memory-mapped Arrow with filter pushdown
+    compact = False
+
+    def __init__(self, path, version):
+        import pyarrow.dataset as ds
+        import pyarrow.fs as fs
+
+        self.path = path
+        self.version = version
+        self.dataset = ds.dataset(
+            path, format='parquet', partitioning='hive',
+            filesystem=fs.LocalFileSystem(use_mmap=True),
+        )
+        meta = read_meta(path)
+        self.legacy_dtypes = meta.get('legacy_dtypes', {})
+        # Lets the cube list Conditions and Genders as the CSV backend does
+        self.level_order = meta.get('levels')
+
+    def _expression(self, spec=None):
+        import pyarrow.dataset as ds
+
+        expression = ds.field('complete') == True  # noqa: E712
+        if spec is not None:
+            expression &= (ds.field('Age') >= spec.age_range[0]) & (ds.field('Age') <= spec.age_range[1])
+            for column, value in spec.equals:
+                expression &= ds.field(column) == value
+        return expression
+
+    def filter(self, spec, columns=None):
+        # Only the matching partitions, row groups and columns are read
+        table = self.dataset.to_table(columns=columns or COLUMNS, filter=self._expression(spec))
+        return table.to_pandas()
+
+    def complete_batches(self, columns):
+        empty = True
+        for batch in self.dataset.to_batches(columns=columns, filter=self._expression()):
+            empty = False
+            yield batch.to_pandas()
+        if empty:
+            yield pd.DataFrame({column: pd.Series(dtype=TEXT_DTYPE) for column in columns})
+
+    def legacy(self, frame):
+        frame = frame.copy()
+        for column in frame.columns:
+            if column in self.legacy_dtypes:
+                frame[column] = frame[column].astype(self.legacy_dtypes[column])
+            elif isinstance(frame[column].dtype, pd.CategoricalDtype):
+                frame[column] = frame[column].astype(TEXT_DTYPE)
+        return frame
+
+
+def read_meta(path):
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return {}
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _add_levels(levels, frame):
+    # Extend each column's first-appearance order with the complete rows of frame
+    complete = frame[COLUMNS].notna().all(axis=1)
+    for column in LEVEL_COLUMNS:
+        seen = set(levels.setdefault(column, []))
+        levels[column].extend(value for value in pd.unique(frame.loc[complete, column]) if value not in seen)
+    return levels
+
+
+def load_parquet_dataset(path):
+    path = os.path.abspath(path)
+    version = directory_signature(path)
+    dataset = _parquet_datasets.get(path)
+    if dataset is not None and dataset.version == version:
+        return dataset
+    with _lock:
+        dataset = _parquet_datasets.get(path)
+        if dataset is None or dataset.version != version:
+            dataset = ParquetDataset(path, version)
+            _parquet_datasets[path] = dataset
+    return dataset
+
+
+def open_dataset(backend=None):
+    # Every backend exposes path, version, filter(), complete_batches() and legacy()
+    backend = backend or config.BACKEND
+    if backend == 'csv':
+        with stage('load') as timing:
+            dataset = load_dataset(config.DATA_FILE)
+            timing.rows = dataset.rows
+        # Indexed SQLite copy, only re-ingested when the data version changes
+        with stage('sqlite_sync'):
+            ensure_store(dataset)
+        return dataset
+    if backend == 'parquet':
+        with stage('load'):
+            return load_parquet_dataset(config.PARQUET_DIR)
+    raise ValueError(f"Unknown storage backend {backend!r}, expected 'csv' or 'parquet'")
+
+
+def write_parquet(csv_path, out_dir, partition_by='Condition', chunk_rows=500000):
+    # Convert the CSV a chunk at a time; the new directory replaces the old one atomically
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    schema = _arrow_schema()
+    staging = f'{out_dir.rstrip(os.sep)}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+
+    has_nulls = dict.fromkeys(INTEGRAL_COLUMNS, False)
+    levels = {}
+
+    def batches():
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            for column in INTEGRAL_COLUMNS:
+                has_nulls[column] |= bool(chunk[column].isna().any())
+            _add_levels(levels, chunk)
+            chunk['complete'] = chunk[COLUMNS].notna().all(axis=1)
+            yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+    ds.write_dataset(
+        batches(), staging, schema=schema, format='parquet',
+        partitioning=[partition_by], partitioning_flavor='hive',
+    )
+    legacy_dtypes = {column: 'float64' if nulls else 'int64' for column, nulls in has_nulls.items()}
+    with open(os.path.join(staging, META_FILE), 'w') as f:
+        json.dump({'source': os.path.basename(csv_path), 'legacy_dtypes': legacy_dtypes, 'levels': levels}, f)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(staging, out_dir)
+    return out_dir
+
+
+def append_parquet(frame, out_dir, version, partition_by='Condition'):
+    # Appended rows (read_csv layout) as new files in their partitions; existing files stay
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    frame = frame[COLUMNS].assign(complete=frame[COLUMNS].notna().all(axis=1))
+    ds.write_dataset(
+        pa.Table.from_pandas(frame, schema=_arrow_schema(), preserve_index=False), out_dir,
+        format='parquet', partitioning=[partition_by], partitioning_flavor='hive',
+        basename_template=f'append-{version[:16]}-{{i}}.parquet', existing_data_behavior='overwrite_or_ignore',
+    )
+    meta_path = os.path.join(out_dir, META_FILE)
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        for column in INTEGRAL_COLUMNS:
+            if frame[column].isna().any():
+                meta['legacy_dtypes'][column] = 'float64'
+        if 'levels' in meta:
+            _add_levels(meta['levels'], frame)
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+    return out_dir
+
+
+if __name__ == '__main__':
+    # python backends.py [source.csv] [parquet_dir]
+    source = sys.argv[1] if len(sys.argv) > 1 else config.DATA_FILE
+    target = sys.argv[2] if len(sys.argv) > 2 else config.PARQUET_DIR
+    print(write_parquet(source, target))
@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+import charts
+import config
+import db_pool
+import export
+import store
+from aggregates import CUBE_COLUMNS, Cube, cells, merge_cells
+from backends import ParquetDataset, directory_signature, write_parquet
+from data_loader import Dataset, file_hash, file_signature, read_compact
+from filter_engine import FilterSpec
+
+
+def _filter_specs(clean, count, rng):
+    # Condition x Gender pairs that exist in the data, with random age ranges
+    pairs = clean[['Condition', 'Gender']].drop_duplicates().astype(str).to_numpy()
+    ages = clean['Age'].to_numpy(dtype=np.float64)
+    low, high = float(ages.min()), float(ages.max())
+    specs = []
+    for _ in range(count):
+        condition, gender = pairs[rng.integers(len(pairs))]
+        start, stop = sorted(rng.uniform(low, high, size=2))
+        specs.append(FilterSpec.home((start, stop), gender, condition))
+    return specs
+
+
+class Bench:
+    def __init__(self, repeats, trace_memory=True):
+        self.repeats = repeats
+        self.trace_memory = trace_memory
+        self.results = {}
+
+    def stage(self, name, run, repeats=None):
+        # run(i) does one iteration and returns the number of rows it processed
+        timings = []
+        rows = 0
+        for i in range(repeats or self.repeats):
+            start = time.perf_counter()
+            rows = run(i)
+            timings.append(time.perf_counter() - start)
+        peak = None
+        if self.trace_memory:
+            # Separate traced run, so tracemalloc overhead stays out of the timings
+            tracemalloc.start()
+            run(0)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        milliseconds = np.array(timings) * 1000
+        self.results[name] = {
+            'runs': len(timings),
+            'rows': int(rows),
+            'mean_ms': float(milliseconds.mean()),
+            'p50_ms': float(np.percentile(milliseconds, 50)),
+            'p95_ms': float(np.percentile(milliseconds, 95)),
+            'p99_ms': float(np.percentile(milliseconds, 99)),
+            'max_ms': float(milliseconds.max()),
+            'peak_mb': None if peak is None else peak / (1024 * 1024),
+        }
+        print(f"{name:>18}: p50 {self.results[name]['p50_ms']:10.2f} ms  p95 {self.results[name]['p95_ms']:10.2f} ms", file=sys.stderr)
+
+
+def run(data, backend='csv', compact=True, repeats=20, ingest_repeats=3, seed=0, trace_memory=True):
+    bench = Bench(repeats, trace_memory)
+    rng = np.random.default_rng(seed)
+    workdir = tempfile.mkdtemp(prefix='dashboard-bench-')
+    state = {}
+    try:
+        # Load and clean
+        if backend == 'parquet':
+            parquet_dir = os.path.join(workdir, 'parquet')
+            write_parquet(data, parquet_dir)
+            version = directory_signature(parquet_dir)
+
+            def load(i):
+                state['dataset'] = ParquetDataset(parquet_dir, version)
+                return state['dataset'].dataset.count_rows()
+            bench.stage('load', load)
+        else:
+            version = file_hash(data)
+
+            def load(i):
+                if compact:
+                    state['loaded'] = read_compact(data)
+                    return len(state['loaded'][0])
+                state['loaded'] = (pd.read_csv(data), None, None)
+                return len(state['loaded'][0])
+            bench.stage('load', load)
+
+            def clean(i):
+                frame, legacy_dtypes, patient_id_format = state['loaded']
+                state['dataset'] = Dataset.from_raw(data, frame, file_signature(data), version, legacy_dtypes, patient_id_format)
+                return len(state['dataset'].clean)
+            bench.stage('clean', clean)
+
+            def sqlite_ingest(i):
+                db_path = os.path.join(workdir, f'ingest-{i}.db')
+                # Same pragmas and WAL journal as the dashboard's writer
+                pool = db_pool.ConnectionPool(db_path)
+                try:
+                    with pool.writer() as conn:
+                        store.migrate(conn)
+                        store.ingest(conn, state['dataset'].raw_chunks(store.INGEST_CHUNK_ROWS), version)
+                finally:
+                    pool.close()
+                    for suffix in ('', '-wal', '-shm'):
+                        if os.path.exists(db_path + suffix):
+                            os.remove(db_path + suffix)
+                return state['dataset'].rows
+            bench.stage('sqlite_ingest', sqlite_ingest, repeats=ingest_repeats)
+
+        dataset = state['dataset']
+        sample = next(dataset.complete_batches(['Condition', 'Gender', 'Age']))
+        specs = _filter_specs(sample, repeats, rng)
+        filtered = {}
+
+        def filter_rows(i):
+            filtered[i] = dataset.filter(specs[i % len(specs)])
+            return len(filtered[i])
+        bench.stage('filter', filter_rows)
+
+        def groupby(i):
+            return len(filtered[i].groupby('Drug', observed=True)['Recovery Rate'].mean().reset_index())
+        bench.stage('groupby', groupby)
+
+        def summary_metrics(i):
+            frame = filtered[i]
+            frame['Recovery Rate'].mean()
+            frame['Treatment Duration (days)'].mean()
+            frame['Dosage (mg)'].mean()
+            frame['Side Effects'].value_counts()
+            return len(frame)
+        bench.stage('summary_metrics', summary_metrics)
+
+        def cube_build(i):
+            state['cube'] = Cube(*merge_cells(cells(batch) for batch in dataset.complete_batches(CUBE_COLUMNS)), version, getattr(dataset, 'level_order', None))
+            return int(state['cube'].counts[..., -1, :].sum())
+        bench.stage('cube_build', cube_build, repeats=max(1, min(repeats, 5)))
+
+        def cube_query(i):
+            spec = specs[i % len(specs)]
+            return state['cube'].query(spec.age_range, spec.value('Gender'), spec.value('Condition')).count
+        bench.stage('cube_query', cube_query)
+
+        figures = {}
+
+        def figure_build(i):
+            spec = specs[i % len(specs)]
+            summary = state['cube'].query(spec.age_range, spec.value('Gender'), spec.value('Condition'))
+            figures[i] = [
+                charts.build_recovery_bar(summary.drug_recovery()),
+                charts.build_side_effect_pie(summary.side_effect_counts()),
+                charts.build_age_recovery_scatter(filtered[i]),
+            ]
+            return len(filtered[i])
+        bench.stage('figure_build', figure_build)
+
+        payload = {}
+
+        def figure_serialize(i):
+            payload[i] = sum(len(pio.to_json(fig, validate=False)) for fig in figures[i])
+            return len(filtered[i])
+        bench.stage('figure_serialize', figure_serialize)
+        bench.results['figure_serialize']['payload_bytes_p50'] = float(np.median(list(payload.values())))
+
+        def csv_export(i):
+            path = os.path.join(workdir, f'export-{i}.csv')
+            export.write_export(path, 'CSV', dataset, filtered[i])
+            os.remove(path)
+            return len(filtered[i])
+        bench.stage('csv_export', csv_export)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'data': os.path.abspath(data),
+            'rows': bench.results['load']['rows'],
+            'backend': backend,
+            'compact': compact if backend == 'csv' else None,
+            'repeats': repeats,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'scatter_webgl_rows': config.SCATTER_WEBGL_ROWS,
+            'scatter_bin_rows': config.SCATTER_BIN_ROWS,
+        },
+        'stages': bench.results,
+    }
+
+
+# Runs in a fresh interpreter per sample: import Streamlit, then render one page twice.
+# Streamlit imports parts of plotly itself; plotly.express is what charts.py adds.
+_COLD_START = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file('main.py', default_timeout=600)
+at.session_state['page'] = sys.argv[1]
+at.run()
+first = time.perf_counter()
+at.run()
+second = time.perf_counter()
+print(json.dumps({
+    'import_streamlit': imported - start,
+    'first_run': first - imported,
+    'rerun': second - first,
+    'pandas_loaded': 'pandas' in sys.modules,
+    'plotly_express_loaded': 'plotly.express' in sys.modules,
+    'errors': [e.value for e in at.exception],
+}))
+"""
+
+
+def cold_start(pages=('Symptoms', 'Precautions', 'Home'), repeats=5):
+    # First render of each page in a new process, the way a freshly started server sees it.
+    # Warm-up stays off so the numbers are the page's own; the on-disk caches (store, catalog,
+    # image variants) are whatever the app directory currently has.
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, DASHBOARD_WARMUP='0')
+    results = {}
+    for page in pages:
+        samples = []
+        for _ in range(repeats):
+            out = subprocess.run([sys.executable, '-c', _COLD_START, page], cwd=app_dir, env=env, capture_output=True, text=True, check=True)
+            samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        results[page] = {
+            **{key: round(float(np.median([s[key] for s in samples])) * 1000, 1) for key in ('import_streamlit', 'first_run', 'rerun')},
+            'pandas_loaded': any(s['pandas_loaded'] for s in samples),
+            'plotly_express_loaded': any(s['plotly_express_loaded'] for s in samples),
+            'errors': sorted({e for s in samples for e in s['errors']}),
+        }
+    return {
+        'meta': {'repeats': repeats, 'unit': 'ms (p50)', 'python': platform.python_version()},
+        'pages': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the Home page pipeline stages outside Streamlit.')
+    parser.add_argument('--data', default=config.DATA_FILE, help='CSV with the dataset schema (see synth.py)')
+    parser.add_argument('--backend', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--legacy-frame', action='store_true', help='load with plain read_csv dtypes')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--ingest-repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc peak-memory runs')
+    parser.add_argument('--cold-start', type=int, nargs='?', const=5, metavar='REPEATS', help='time the first render of each page in fresh processes instead')
+    parser.add_argument('--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+    if args.cold_start:
+        report = cold_start(repeats=args.cold_start)
+    else:
+        report = run(args.data, args.backend, not args.legacy_frame, args.repeats, args.ingest_repeats, args.seed, not args.no_memory)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import threading
+
+import config
+
+# Small facts about the current data (so far the Condition list) that pages without
+# charts or tables need; kept on disk so a fresh process can answer without pandas
+CATALOG_FILE = os.path.join(config.CACHE_DIR, 'catalog.json')
+
+_catalog = {'signature': None, 'conditions': None}
+_lock = threading.Lock()
+
+
+def file_signature(path):
+    info = os.stat(path)
+    return info.st_size, info.st_mtime_ns
+
+
+def directory_signature(path):
+    # Names, sizes and mtimes of every data file; changes whenever a partition is rewritten
+    entries = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            full = os.path.join(root, name)
+            info = os.stat(full)
+            entries.append((os.path.relpath(full, path), info.st_size, info.st_mtime_ns))
+    entries.sort()
+    return hashlib.sha256(repr(entries).encode('utf-8')).hexdigest()
+
+
+def source_signature():
+    # Cheap identity of the configured source: stat calls only, no hashing of the data
+    if config.BACKEND == 'parquet':
+        return [os.path.abspath(config.PARQUET_DIR), directory_signature(config.PARQUET_DIR)]
+    return [os.path.abspath(config.DATA_FILE), *file_signature(config.DATA_FILE)]
+
+
+def remember(conditions):
+    signature = source_signature()
+    with _lock:
+        _catalog['signature'] = signature
+        _catalog['conditions'] = list(conditions)
+        os.makedirs(os.path.dirname(CATALOG_FILE), exist_ok=True)
+        partial = f'{CATALOG_FILE}.{threading.get_ident()}.tmp'
+        with open(partial, 'w') as f:
+            json.dump({'signature': signature, 'conditions': _catalog['conditions']}, f)
+        os.replace(partial, CATALOG_FILE)
+
+
+def conditions():
+    # Conditions in the sidebar's order, from memory or the catalog file while the source is
+    # unchanged; otherwise loads the data, builds the cube and refreshes the catalog
+    signature = source_signature()
+    if _catalog['signature'] == signature:
+        return _catalog['conditions']
+    try:
+        with open(CATALOG_FILE) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = None
+    if saved is not None and saved['signature'] == signature:
+        with _lock:
+            _catalog.update(saved)
+        return saved['conditions']
+    from aggregates import get_cube
+    from backends import open_dataset
+
+    cube = get_cube(open_dataset())
+    remember(cube.conditions)
+    return cube.conditions
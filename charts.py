@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+import config
+from filter_engine import carried_over, discard_outdated
+from lru import LRUCache
+
+
+def _payload_size(fig):
+    import plotly.io as pio
+
+    return len(pio.to_json(fig, validate=False))
+
+
+# Built figures shared by every session; st.plotly_chart only serializes them
+_figures = LRUCache(config.CHART_CACHE_ENTRIES, config.CHART_CACHE_MB * 1024 * 1024, sizer=_payload_size)
+
+
+def _cached(name, dataset, spec, build, *extra):
+    key = (name, spec, dataset.path, dataset.version) + extra
+    previous = (dataset.path, getattr(dataset, 'previous_version', None))
+    discard_outdated('charts', _figures, dataset, lambda k: k[1] if k[2:4] == previous else None)
+    fig = _figures.get(key)
+    if fig is None and carried_over(dataset, spec):
+        fig = _figures.move((name, spec) + previous + extra, key)
+    if fig is None:
+        fig = _figures.put(key, build())
+    return fig
+
+
+def build_recovery_bar(drug_recovery):
+    # Plotly is imported on the first figure build, so pages without charts never load it
+    import plotly.express as px
+
+    return px.bar(drug_recovery, x='Drug', y='Recovery Rate', title='Average Recovery Rate by Drug')
+
+
+def build_side_effect_pie(side_effects):
+    import plotly.express as px
+
+    return px.pie(side_effects, names='Side Effects', values='count', title='Side Effect Distribution')
+
+
+def recovery_bar(dataset, spec, drug_recovery):
+    return _cached('recovery_bar', dataset, spec, lambda: build_recovery_bar(drug_recovery))
+
+
+def side_effect_pie(dataset, spec, side_effects):
+    return _cached('side_effect_pie', dataset, spec, lambda: build_side_effect_pie(side_effects))
+
+
+def scatter_mode(rows):
+    # SVG for small results, WebGL for medium ones, server-side bins beyond that
+    if rows > config.SCATTER_BIN_ROWS:
+        return 'binned'
+    if rows > config.SCATTER_WEBGL_ROWS:
+        return 'webgl'
+    return 'svg'
+
+
+def _binned_age_recovery(frame):
+    import plotly.express as px
+
+    # One count per (Drug, Age, Recovery Rate bin) instead of one point per patient
+    recovery = frame['Recovery Rate'].to_numpy(dtype=np.float64)
+    edges = np.linspace(recovery.min(), recovery.max(), config.SCATTER_RECOVERY_BINS + 1)
+    bins = np.clip(np.searchsorted(edges, recovery, side='right') - 1, 0, config.SCATTER_RECOVERY_BINS - 1)
+    centers = (edges[:-1] + edges[1:]) / 2
+    binned = pd.DataFrame({
+        'Drug': frame['Drug'].to_numpy(),
+        'Age': frame['Age'].to_numpy(dtype=np.int64),
+        'Recovery Rate': centers[bins],
+    })
+    binned = binned.groupby(['Drug', 'Age', 'Recovery Rate'], observed=True).size().reset_index(name='Patients')
+    return px.density_heatmap(
+        binned, x='Age', y='Recovery Rate', z='Patients', histfunc='sum',
+        facet_col='Drug', facet_col_wrap=3,
+        nbinsx=int(binned['Age'].max() - binned['Age'].min() + 1), nbinsy=config.SCATTER_RECOVERY_BINS,
+        title='Age vs. Recovery Rate (patients per bin)',
+    )
+
+
+def build_age_recovery_scatter(frame, mode=None):
+    mode = mode or scatter_mode(len(frame))
+    if mode == 'binned':
+        return _binned_age_recovery(frame)
+    import plotly.express as px
+
+    return px.scatter(frame, x='Age', y='Recovery Rate', color='Drug', title='Age vs. Recovery Rate',
+                      render_mode='webgl' if mode == 'webgl' else 'svg')
+
+
+def age_recovery_scatter(dataset, spec, frame):
+    mode = scatter_mode(len(frame))
+    return _cached('age_recovery_scatter', dataset, spec, lambda: build_age_recovery_scatter(frame, mode), mode)
+
+
+def cache_stats():
+    return _figures.stats()
@@ -0,0 +1,80 @@
+import os
+
+# Every setting can be overridden with an environment variable of the same name
+# prefixed with DASHBOARD_, e.g. DASHBOARD_COMPACT_FRAME=0
+
+
+def _env(name, default, kind=str):
+    value = os.environ.get(f'DASHBOARD_{name}')
+    if value is None:
+        return default
+    if kind is bool:
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return kind(value)
+
+
+# Derived files (exports and other generated artifacts) live under this directory
+CACHE_DIR = _env('CACHE_DIR', '.cache')
+
+# Storage backend: 'csv' (CSV parsed in memory plus the SQLite store) or 'parquet'
+# (Condition-partitioned Parquet directory built with `python backends.py`)
+BACKEND = _env('BACKEND', 'csv')
+DATA_FILE = _env('DATA_FILE', 'drug_effectiveness_realistic_null_weight_data.csv')
+PARQUET_DIR = _env('PARQUET_DIR', 'drug_effectiveness_parquet')
+
+# Load the patient data with categorical text columns and downcast numbers
+COMPACT_FRAME = _env('COMPACT_FRAME', True, bool)
+
+# Filtered-row cache shared by all sessions, bounded by entries and by size
+FILTER_CACHE_ENTRIES = _env('FILTER_CACHE_ENTRIES', 64, int)
+FILTER_CACHE_MB = _env('FILTER_CACHE_MB', 256, int)
+
+# Exports are written in chunks of this many rows and the newest files are kept on disk
+EXPORT_CHUNK_ROWS = _env('EXPORT_CHUNK_ROWS', 50000, int)
+EXPORT_CACHE_FILES = _env('EXPORT_CACHE_FILES', 32, int)
+
+# Home page patient table: one page at a time from the store (keyset pagination), or the
+# whole filtered result in a single grid when TABLE_PAGINATE is off
+TABLE_PAGINATE = _env('TABLE_PAGINATE', True, bool)
+TABLE_PAGE_SIZE = _env('TABLE_PAGE_SIZE', 50, int)
+
+# Age vs. Recovery Rate: WebGL above the first row count, server-side 2-D bins above the second
+SCATTER_WEBGL_ROWS = _env('SCATTER_WEBGL_ROWS', 2000, int)
+SCATTER_BIN_ROWS = _env('SCATTER_BIN_ROWS', 100000, int)
+SCATTER_RECOVERY_BINS = _env('SCATTER_RECOVERY_BINS', 40, int)
+
+# Built Plotly figures shared by all sessions, keyed by chart, filter spec and data version
+CHART_CACHE_ENTRIES = _env('CHART_CACHE_ENTRIES', 128, int)
+CHART_CACHE_MB = _env('CHART_CACHE_MB', 64, int)
+
+# Symptoms/Precautions page content, and the resized WebP variants of its images
+# (cached in memory and under CACHE_DIR/images, keyed by the source file's content hash)
+CONTENT_FILE = _env('CONTENT_FILE', 'conditions.json')
+IMAGE_WIDTH = _env('IMAGE_WIDTH', 960, int)
+IMAGE_QUALITY = _env('IMAGE_QUALITY', 80, int)
+IMAGE_CACHE_ENTRIES = _env('IMAGE_CACHE_ENTRIES', 64, int)
+IMAGE_CACHE_MB = _env('IMAGE_CACHE_MB', 32, int)
+
+# Per-stage timing: a sidebar performance panel plus one JSON line per rerun on the
+# 'dashboard.metrics' logger (and appended to METRICS_FILE when set)
+INSTRUMENTATION = _env('INSTRUMENTATION', False, bool)
+METRICS_FILE = _env('METRICS_FILE', '')
+METRICS_WINDOW = _env('METRICS_WINDOW', 500, int)
+
+# Login: PBKDF2 work factor, verification threads, signed session token lifetime and key
+AUTH_ITERATIONS = _env('AUTH_ITERATIONS', 600000, int)
+AUTH_WORKERS = _env('AUTH_WORKERS', 2, int)
+AUTH_TOKEN_SECONDS = _env('AUTH_TOKEN_SECONDS', 8 * 60 * 60, int)
+AUTH_SECRET = _env('AUTH_SECRET', '')
+
+# SQLite: read-only connections kept per database file (one writer on top), how long
+# a session waits for one, and the per-connection memory-map / page-cache budgets
+SQLITE_POOL_SIZE = _env('SQLITE_POOL_SIZE', 4, int)
+SQLITE_POOL_TIMEOUT = _env('SQLITE_POOL_TIMEOUT', 10.0, float)
+SQLITE_MMAP_MB = _env('SQLITE_MMAP_MB', 256, int)
+SQLITE_CACHE_MB = _env('SQLITE_CACHE_MB', 16, int)
+SQLITE_SYNCHRONOUS = _env('SQLITE_SYNCHRONOUS', 'NORMAL')
+
+# Cold start: after the first page is served, load the data, cube, default charts and
+# image variants on a background thread so later page switches don't pay for them
+WARMUP = _env('WARMUP', True, bool)
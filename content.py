@@ -0,0 +1,49 @@
+import json
+import threading
+
+import config
+from catalog import file_signature
+
+CONTENT_FILE = config.CONTENT_FILE
+
+# Parsed registry, reloaded only when the file changes
+_registry = {'signature': None, 'pages': {}}
+_lock = threading.Lock()
+
+
+def load_registry(path=CONTENT_FILE):
+    # {'symptoms': {condition: entry}, 'precautions': {...}}; an entry has an image, a caption
+    # and blocks, each {'write': text}, {'markdown': html} or {'link': url, 'label': text}
+    signature = file_signature(path)
+    if _registry['signature'] == signature:
+        return _registry['pages']
+    with _lock:
+        if _registry['signature'] != signature:
+            with open(path, encoding='utf-8') as f:
+                _registry['pages'] = json.load(f)
+            _registry['signature'] = signature
+    return _registry['pages']
+
+
+def entry(page, condition):
+    return load_registry().get(page, {}).get(condition)
+
+
+def image_paths():
+    return sorted({item['image'] for page in load_registry().values() for item in page.values() if item.get('image')})
+
+
+def render(st, item):
+    # Draws one registry entry the way the pages used to, with the image served as a
+    # resized WebP variant (see assets.py)
+    import assets
+
+    if item.get('image'):
+        st.image(assets.image(item['image']), caption=item.get('caption'), use_container_width=True)
+    for block in item['blocks']:
+        if 'markdown' in block:
+            st.markdown(block['markdown'], unsafe_allow_html=True)
+        elif 'link' in block:
+            st.write(f"[{block['label']}]({block['link']})")
+        else:
+            st.write(block['write'])
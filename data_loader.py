@@ -0,0 +1,374 @@
+import hashlib
+import io
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+from catalog import file_signature
+
+DATA_FILE = config.DATA_FILE
+HASH_BLOCK_SIZE = 1 << 20
+
+# Low-cardinality text columns kept as pandas categoricals in compact mode
+CATEGORICAL_COLUMNS = ['Drug', 'Gender', 'Condition', 'Side Effects', 'Blood Type']
+# Whole-number columns that pandas reads as float64 because of missing values
+INTEGRAL_COLUMNS = ['Age', 'Treatment Duration (days)']
+PATIENT_ID_PATTERN = re.compile(r'^([A-Za-z]+)(\d+)$')
+# Dtype pd.read_csv gives text columns (object before pandas 3, str after)
+TEXT_DTYPE = pd.Series(['', None]).dtype
+
+logger = logging.getLogger(__name__)
+
+# One parsed copy per source file, shared by every session in the process
+_datasets = {}
+_lock = threading.Lock()
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "hash_checks": 0,
+    "reloads": 0,
+    "appends": 0,
+    "last_reload_seconds": None,
+    "total_reload_seconds": 0.0,
+}
+
+
+class _Prefix(io.RawIOBase):
+    # Read-only view of the first `size` bytes of an open binary file
+    def __init__(self, f, size):
+        self.f = f
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self.f.readinto(memoryview(buffer)[:self.remaining])
+        self.remaining -= count
+        return count
+
+
+class Dataset:
+    # Only the complete rows stay in memory; the store reads the whole file when it needs it
+    def __init__(self, path, clean, signature, version, rows, dtypes, legacy_dtypes=None, patient_id_format=None):
+        self.path = path
+        self.clean = clean
+        # Row count and column dtypes of the parsed file, incomplete rows included
+        self.rows = rows
+        self.dtypes = dtypes
+        self.signature = signature
+        self.version = version
+        # Bytes of the file the rows were parsed from; appends are read from here on
+        self.offset = signature[0]
+        self.loaded_at = time.time()
+        # Set when the frame was compacted, used to restore the original layout
+        self.legacy_dtypes = legacy_dtypes
+        self.patient_id_format = patient_id_format
+        # Set by extend(): the version this one grew from and the rows added to it
+        self.previous_version = None
+        self.appended = None
+        self.appended_clean = None
+
+    @classmethod
+    def from_raw(cls, path, raw, signature, version, legacy_dtypes=None, patient_id_format=None):
+        # Data Cleaning (Handle Nulls)
+        return cls(path, raw.dropna(), signature, version, len(raw), raw.dtypes.to_dict(), legacy_dtypes, patient_id_format)
+
+    def filter(self, spec, columns=None):
+        # Complete rows matching a filter_engine.FilterSpec
+        frame = self.clean[spec.mask(self.clean)]
+        return frame if columns is None else frame[columns]
+
+    def complete_batches(self, columns):
+        yield self.clean[columns]
+
+    def extend(self, tail, signature, version, offset):
+        # New Dataset with `tail` (rows parsed from the bytes appended to the file up to
+        # `offset`) after the current rows. None when the compact layout can't absorb them,
+        # e.g. a PatientID in another format or a number outside a downcast column's range;
+        # reload then.
+        clean = self.clean
+        tail = tail[list(clean.columns)]
+        tail.index = pd.RangeIndex(self.rows, self.rows + len(tail))
+        legacy_dtypes = dict(self.legacy_dtypes) if self.compact else None
+        dtypes = dict(self.dtypes)
+        if self.compact:
+            converted = {}
+            for column in clean.columns:
+                values = tail[column]
+                current = clean[column].dtype
+                if isinstance(current, pd.CategoricalDtype):
+                    known = set(current.categories)
+                    extra = [value for value in pd.unique(values.dropna()) if value not in known]
+                    if extra:
+                        clean = clean.assign(**{column: clean[column].cat.add_categories(extra)})
+                    converted[column] = pd.Categorical(values, categories=clean[column].cat.categories)
+                elif column == 'PatientID':
+                    converted[column] = _patient_numbers(values, self.patient_id_format, current)
+                    if converted[column] is None:
+                        return None
+                elif pd.api.types.is_integer_dtype(current):
+                    present = values.dropna()
+                    info = np.iinfo(current.numpy_dtype)
+                    if len(present) and ((present % 1 != 0).any() or present.min() < info.min or present.max() > info.max):
+                        return None
+                    converted[column] = values.astype(current)
+                else:
+                    converted[column] = values.astype(current)
+                if column in INTEGRAL_COLUMNS and values.isna().any():
+                    legacy_dtypes[column] = np.dtype('float64')
+            tail = pd.DataFrame(converted, index=tail.index)
+            dtypes = tail.dtypes.to_dict()
+        else:
+            # What read_csv would give the whole file, e.g. int64 becomes float64 with a gap
+            for column, current in dtypes.items():
+                added = tail[column].dtype
+                if all(isinstance(d, np.dtype) and d.kind in 'iuf' for d in (current, added)):
+                    dtypes[column] = np.promote_types(current, added)
+        dataset = Dataset(
+            self.path, pd.concat([clean, tail.dropna()]), signature, version, self.rows + len(tail),
+            dtypes, legacy_dtypes, self.patient_id_format,
+        )
+        dataset.offset = offset
+        dataset.previous_version = self.version
+        dataset.appended = tail
+        dataset.appended_clean = dataset.clean.iloc[len(clean):]
+        return dataset
+
+    def raw_chunks(self, chunk_rows):
+        # Every row of this version, incomplete ones too, in the read_csv layout a chunk at a
+        # time; only the bytes the version covers are read, whatever was appended since
+        with open(self.path, 'rb') as f:
+            yield from pd.read_csv(io.BufferedReader(_Prefix(f, self.offset)), chunksize=chunk_rows)
+
+    @property
+    def compact(self):
+        return self.legacy_dtypes is not None
+
+    def legacy(self, frame):
+        # Same columns and dtypes pd.read_csv would have produced, e.g. for CSV export
+        if not self.compact:
+            return frame
+        frame = frame.copy()
+        if self.patient_id_format is not None and 'PatientID' in frame:
+            prefix, width = self.patient_id_format
+            numbers = frame['PatientID'].to_numpy(dtype=np.int64, na_value=-1).tolist()
+            text = [None if number < 0 else f'{prefix}{number:0{width}d}' for number in numbers]
+            frame['PatientID'] = pd.Series(text, index=frame.index, dtype=object).astype(self.legacy_dtypes['PatientID'])
+        for column in CATEGORICAL_COLUMNS + INTEGRAL_COLUMNS:
+            if column in frame:
+                frame[column] = frame[column].astype(self.legacy_dtypes[column])
+        return frame
+
+
+def _smallest_integer_dtype(low, high):
+    for dtype in ('UInt8', 'UInt16', 'UInt32', 'Int8', 'Int16', 'Int32'):
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return dtype
+    return 'Int64'
+
+
+def _compact_patient_ids(ids):
+    # 'PID00042' -> 42, provided every ID shares one prefix and width
+    categories = ids.cat.categories
+    parts = [PATIENT_ID_PATTERN.match(value) for value in categories]
+    if not parts or not all(parts):
+        return ids, None
+    prefixes = {part.group(1) for part in parts}
+    widths = {len(part.group(2)) for part in parts}
+    if len(prefixes) != 1 or len(widths) != 1:
+        return ids, None
+    numbers = np.array([int(part.group(2)) for part in parts], dtype=np.int64)
+    codes = ids.cat.codes.to_numpy()
+    values = pd.array(numbers[codes], dtype=_smallest_integer_dtype(numbers.min(), numbers.max()))
+    values[codes < 0] = pd.NA
+    return pd.Series(values, index=ids.index, name=ids.name), (prefixes.pop(), widths.pop())
+
+
+def _patient_numbers(ids, patient_id_format, dtype):
+    # Appended PatientIDs in the compact numeric form, or None if any doesn't fit it
+    prefix, width = patient_id_format
+    numbers = []
+    for value in ids.tolist():
+        part = None if pd.isna(value) else PATIENT_ID_PATTERN.match(value)
+        if part is None:
+            if not pd.isna(value):
+                return None
+            numbers.append(None)
+        elif part.group(1) != prefix or len(part.group(2)) != width:
+            return None
+        else:
+            numbers.append(int(part.group(2)))
+    present = [number for number in numbers if number is not None]
+    info = np.iinfo(dtype.numpy_dtype)
+    if present and (min(present) < info.min or max(present) > info.max):
+        return None
+    return pd.array(numbers, dtype=dtype)
+
+
+def read_compact(path):
+    dtypes = {column: 'category' for column in CATEGORICAL_COLUMNS + ['PatientID']}
+    frame = pd.read_csv(path, dtype=dtypes)
+    legacy_dtypes = {column: TEXT_DTYPE for column in CATEGORICAL_COLUMNS + ['PatientID']}
+    for column in INTEGRAL_COLUMNS:
+        values = frame[column]
+        legacy_dtypes[column] = values.dtype if values.isna().any() else 'int64'
+        present = values.dropna()
+        if len(present) and (present % 1 == 0).all():
+            frame[column] = values.astype(_smallest_integer_dtype(present.min(), present.max()))
+    frame['PatientID'], patient_id_format = _compact_patient_ids(frame['PatientID'])
+    return frame, legacy_dtypes, patient_id_format
+
+
+def read_appended(path, offset):
+    # (rows, end): the complete lines after `offset`, parsed with the loader's column types,
+    # and the offset just past them. A line still being written is left for the next load.
+    # Rows is None when `offset` doesn't end a line, so the new bytes can't be parsed alone.
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(offset - 1)
+        if f.read(1) != b'\n':
+            return None, offset
+        data = f.read()
+    data = data[:data.rfind(b'\n') + 1]
+    columns = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+    if not data:
+        return pd.DataFrame(columns=columns), offset
+    text = {column: str for column in CATEGORICAL_COLUMNS + ['PatientID']}
+    return pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=text), offset + len(data)
+
+
+def file_hash(path, size=None):
+    # Hash the first `size` bytes (the whole file when size is None)
+    digest = hashlib.sha256()
+    remaining = size
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            block = f.read(HASH_BLOCK_SIZE if remaining is None else min(HASH_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return digest.hexdigest()
+
+
+def file_hashes(path, prefix_size):
+    # (hash of the first prefix_size bytes, hash of the whole file) in one read
+    digest = hashlib.sha256()
+    prefix = None
+    read = 0
+    with open(path, 'rb') as f:
+        while True:
+            if prefix is None and read == prefix_size:
+                prefix = digest.hexdigest()
+            limit = HASH_BLOCK_SIZE if prefix is not None else min(HASH_BLOCK_SIZE, prefix_size - read)
+            block = f.read(limit)
+            if not block:
+                break
+            digest.update(block)
+            read += len(block)
+    return prefix, digest.hexdigest()
+
+
+def load_dataset(path=DATA_FILE, compact=None):
+    path = os.path.abspath(path)
+    compact = config.COMPACT_FRAME if compact is None else compact
+    signature = file_signature(path)
+    key = (path, compact)
+    with _lock:
+        cached = _datasets.get(key)
+        # Fast path: size and mtime unchanged since the last parse
+        if cached is not None and cached.signature == signature:
+            _stats["hits"] += 1
+            return cached
+        # Size or mtime moved, only re-parse if the content actually changed
+        start = time.perf_counter()
+        if cached is not None and signature[0] > cached.offset:
+            # Grown file: if the old bytes are untouched, only the new rows need parsing
+            prefix, version = file_hashes(path, cached.offset)
+        else:
+            prefix, version = None, file_hash(path)
+        _stats["hash_checks"] += 1
+        if cached is not None and cached.version == version:
+            cached.signature = signature
+            _stats["hits"] += 1
+            return cached
+        tail = None
+        if prefix is not None and prefix == cached.version:
+            tail, end = read_appended(path, cached.offset)
+            if tail is not None and end == cached.offset:
+                # Only part of a row so far: keep the current rows until it is complete
+                cached.signature = signature
+                _stats["hits"] += 1
+                return cached
+        _stats["misses"] += 1
+        dataset = None
+        if tail is not None:
+            # The version covers exactly the bytes parsed, so the next append starts at `end`
+            if end < signature[0]:
+                version = file_hash(path, end)
+            dataset = cached.extend(tail, signature, version, end)
+        if dataset is not None:
+            elapsed = time.perf_counter() - start
+            _datasets[key] = dataset
+            _stats["appends"] += 1
+            logger.info("appended %d rows to %s (version %s) in %.3fs", len(tail), path, version[:12], elapsed)
+            return dataset
+        if compact:
+            frame, legacy_dtypes, patient_id_format = read_compact(path)
+            dataset = Dataset.from_raw(path, frame, signature, version, legacy_dtypes, patient_id_format)
+        else:
+            dataset = Dataset.from_raw(path, pd.read_csv(path), signature, version)
+        elapsed = time.perf_counter() - start
+        _datasets[key] = dataset
+        if cached is not None:
+            _stats["reloads"] += 1
+        _stats["last_reload_seconds"] = elapsed
+        _stats["total_reload_seconds"] += elapsed
+        logger.info("loaded %s (%d rows, version %s) in %.3fs", path, dataset.rows, version[:12], elapsed)
+        return dataset
+
+
+def cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["datasets"] = [
+            {"path": path, "compact": compact, "rows": d.rows, "version": d.version}
+            for (path, compact), d in _datasets.items()
+        ]
+    return stats
+
+
+def clear_cache():
+    with _lock:
+        _datasets.clear()
+
+
+def memory_report(path=DATA_FILE):
+    # Per-column bytes of what a process keeps, the cleaned frame, in each layout
+    legacy = pd.read_csv(path).dropna()
+    compact = read_compact(path)[0].dropna()
+    legacy_bytes = legacy.memory_usage(index=False, deep=True)
+    compact_bytes = compact.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        'legacy dtype': legacy.dtypes.astype(str),
+        'legacy bytes': legacy_bytes,
+        'compact dtype': compact.dtypes.astype(str),
+        'compact bytes': compact_bytes,
+    })
+    report.loc['total'] = ['', legacy_bytes.sum(), '', compact_bytes.sum()]
+    report['ratio'] = report['compact bytes'] / report['legacy bytes']
+    return report
+
+
+if __name__ == '__main__':
+    print(memory_report(sys.argv[1] if len(sys.argv) > 1 else DATA_FILE).to_string())
@@ -0,0 +1,168 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    pass
+
+
+def _apply_pragmas(conn):
+    conn.execute(f"PRAGMA busy_timeout = {int(config.SQLITE_POOL_TIMEOUT * 1000)}")
+    conn.execute(f"PRAGMA mmap_size = {config.SQLITE_MMAP_MB * 1024 * 1024}")
+    # Negative cache_size is in KiB rather than pages
+    conn.execute(f"PRAGMA cache_size = -{config.SQLITE_CACHE_MB * 1024}")
+    conn.execute(f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}")
+
+
+class ConnectionPool:
+    # Up to `size` read-only connections plus one writer for a single database file.
+    # WAL lets the readers keep going while the writer commits.
+    def __init__(self, path, size=None, timeout=None):
+        self.path = path
+        self.size = size or config.SQLITE_POOL_SIZE
+        self.timeout = config.SQLITE_POOL_TIMEOUT if timeout is None else timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.writes = 0
+
+    def _open(self, read_only):
+        if read_only:
+            uri = f'file:{os.path.abspath(self.path)}?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA query_only = 1")
+        else:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            # Persistent in the file header, so readers in other processes see WAL too
+            conn.execute("PRAGMA journal_mode = WAL")
+        _apply_pragmas(conn)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open(read_only=True)
+                except Exception:
+                    self._opened -= 1
+                    raise
+            self.waits += 1
+        start = time.perf_counter()
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f'no free connection to {self.path} after {self.timeout:.1f}s') from None
+        finally:
+            with self._lock:
+                self.wait_seconds += time.perf_counter() - start
+
+    @contextmanager
+    def reader(self):
+        conn = self._acquire()
+        with self._lock:
+            self.checkouts += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    @contextmanager
+    def writer(self):
+        # One writer per database, so writes queue here instead of on SQLite's file lock
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = self._open(read_only=False)
+            self.writes += 1
+            yield self._writer
+
+    def checkpoint(self):
+        # Fold the WAL back into the database after a bulk write
+        with self.writer() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._opened -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'database': self.path,
+                'size': self.size,
+                'open': self._opened,
+                'idle': self._idle.qsize(),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_ms': self.wait_seconds * 1000,
+                'writes': self.writes,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path):
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = _pools[path] = ConnectionPool(path)
+    return pool
+
+
+def reader(path):
+    return get_pool(path).reader()
+
+
+def writer(path):
+    return get_pool(path).writer()
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
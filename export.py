@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+
+import config
+from filter_engine import carried_over
+
+logger = logging.getLogger(__name__)
+
+# label -> (file extension, mime type)
+FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+# Builds of the same export are serialized on one of a fixed set of locks, picked by path
+_locks = [threading.Lock() for _ in range(16)]
+
+
+def available_formats():
+    formats = ['CSV', 'CSV (gzip)']
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return formats
+    return formats + ['Parquet']
+
+
+def _chunks(dataset, frame):
+    # Legacy layout one slice at a time, so only a chunk is ever expanded
+    for start in range(0, len(frame), config.EXPORT_CHUNK_ROWS):
+        yield dataset.legacy(frame.iloc[start:start + config.EXPORT_CHUNK_ROWS])
+
+
+def _write_csv(raw, dataset, frame):
+    text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+    header = True
+    for chunk in _chunks(dataset, frame):
+        chunk.to_csv(text, index=False, header=header, lineterminator='\n')
+        header = False
+    if header:
+        # No rows: still write the header line, like DataFrame.to_csv
+        dataset.legacy(frame).to_csv(text, index=False, lineterminator='\n')
+    text.flush()
+    text.detach()
+
+
+def _write_parquet(path, dataset, frame):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in _chunks(dataset, frame):
+            table = pa.Table.from_pandas(chunk, preserve_index=False, schema=writer.schema if writer else None)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+            writer.write_table(table)
+        if writer is None:
+            pq.write_table(pa.Table.from_pandas(dataset.legacy(frame), preserve_index=False), path)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_export(path, fmt, dataset, frame):
+    if fmt == 'Parquet':
+        _write_parquet(path, dataset, frame)
+    elif fmt == 'CSV (gzip)':
+        with open(path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as compressed:
+            _write_csv(compressed, dataset, frame)
+    else:
+        with open(path, 'wb') as raw:
+            _write_csv(raw, dataset, frame)
+
+
+def _prune(directory):
+    # Keep the newest EXPORT_CACHE_FILES exports on disk
+    files = [os.path.join(directory, name) for name in os.listdir(directory) if not name.endswith('.tmp')]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for path in files[config.EXPORT_CACHE_FILES:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def export_path(dataset, spec, fmt, version=None):
+    version = version or dataset.version
+    key = hashlib.sha256(repr((spec.key, dataset.path, version)).encode('utf-8')).hexdigest()[:24]
+    return os.path.join(config.CACHE_DIR, 'exports', f'{key}.{FORMATS[fmt][0]}')
+
+
+def export_file(dataset, spec, frame, fmt):
+    # Build the export once per (spec, data version, format), streaming chunks to disk
+    path = export_path(dataset, spec, fmt)
+    with _locks[hash(path) % len(_locks)]:
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+        # Same rows as the previous data version's export: take that file over
+        if carried_over(dataset, spec):
+            try:
+                os.replace(export_path(dataset, spec, fmt, dataset.previous_version), path)
+                os.utime(path)
+                return path
+            except OSError:
+                pass
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        start = time.perf_counter()
+        partial = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            write_export(partial, fmt, dataset, frame)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        logger.info("exported %d rows as %s in %.3fs", len(frame), fmt, time.perf_counter() - start)
+        _prune(directory)
+    return path
+
+
+def export_loader(dataset, spec, frame, fmt):
+    # Zero-argument callable for st.download_button, only run when clicked
+    def load():
+        with open(export_file(dataset, spec, frame, fmt), 'rb') as f:
+            return f.read()
+    return load
@@ -0,0 +1,86 @@
+import config
+from lru import LRUCache
+
+# Filtered frames shared across sessions; treat them as read-only
+_results = LRUCache(config.FILTER_CACHE_ENTRIES, config.FILTER_CACHE_MB * 1024 * 1024)
+# (cache name, path) -> latest data version whose outdated entries were already dropped
+_swept = {}
+
+
+class FilterSpec:
+    # Age range plus equality filters on any other column, e.g. {'Gender': 'Male'}
+    def __init__(self, age_range, equals=None):
+        self.age_range = (float(age_range[0]), float(age_range[1]))
+        self.equals = tuple(sorted((column, value) for column, value in (equals or {}).items() if value is not None))
+
+    @classmethod
+    def home(cls, age_range, gender, condition):
+        return cls(age_range, {'Gender': gender, 'Condition': condition})
+
+    def value(self, column):
+        return dict(self.equals).get(column)
+
+    @property
+    def key(self):
+        return (self.age_range, self.equals)
+
+    def __eq__(self, other):
+        return isinstance(other, FilterSpec) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f'FilterSpec({self.age_range!r}, {dict(self.equals)!r})'
+
+    def mask(self, frame):
+        ages = frame['Age']
+        mask = (ages >= self.age_range[0]) & (ages <= self.age_range[1])
+        for column, value in self.equals:
+            mask &= frame[column] == value
+        return mask
+
+
+def carried_over(dataset, spec):
+    # True when this data version only appended rows to the previous one and none of
+    # them is a complete row matching spec, so results cached for the previous version hold
+    appended = getattr(dataset, 'appended_clean', None)
+    return appended is not None and not spec.mask(appended).any()
+
+
+def discard_outdated(name, cache, dataset, spec_of):
+    # Once per data version: drops the previous version's entries whose filter matches an
+    # appended row, so they don't hold cache budget until evicted. The others stay for
+    # carried_over to move. spec_of(key) is the entry's FilterSpec if it belongs to
+    # dataset's previous version, else None.
+    appended = getattr(dataset, 'appended_clean', None)
+    if appended is None or _swept.get((name, dataset.path)) == dataset.version:
+        return
+    _swept[(name, dataset.path)] = dataset.version
+
+    def outdated(key):
+        spec = spec_of(key)
+        return spec is not None and bool(spec.mask(appended).any())
+
+    cache.discard(outdated)
+
+
+def filter_rows(dataset, spec):
+    # Complete rows matching spec, computed once per (spec, data version)
+    key = (spec, dataset.path, dataset.compact, dataset.version)
+    previous = (dataset.path, dataset.compact, getattr(dataset, 'previous_version', None))
+    discard_outdated('filter', _results, dataset, lambda k: k[0] if k[1:] == previous else None)
+    frame = _results.get(key)
+    if frame is None and carried_over(dataset, spec):
+        frame = _results.move((spec,) + previous, key)
+    if frame is None:
+        frame = _results.put(key, dataset.filter(spec))
+    return frame
+
+
+def cache_stats():
+    return _results.stats()
+
+
+def clear_cache():
+    _results.clear()
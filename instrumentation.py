@@ -0,0 +1,127 @@
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import config
+
+ENABLED = config.INSTRUMENTATION
+
+logger = logging.getLogger('dashboard.metrics')
+
+# Rolling window of (seconds, rows, bytes) per stage, shared by every session
+_windows = {}
+_lock = threading.Lock()
+# The rerun being recorded on this thread (Streamlit runs each session's script on its own thread)
+_local = threading.local()
+
+
+class _NoopStage:
+    # Returned when instrumentation is off, so `with stage(...)` costs one call
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopStage()
+
+
+class _Stage:
+    __slots__ = ('name', 'rows', 'seconds', 'bytes', '_start', '_memory')
+
+    def __init__(self, name, rows):
+        self.name = name
+        self.rows = rows
+        self.seconds = None
+        self.bytes = None
+
+    def __enter__(self):
+        self._memory = None
+        if tracemalloc.is_tracing():
+            self._memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        if self._memory is not None:
+            # High-water mark above the starting point; tracemalloc is process-wide,
+            # so concurrent sessions can inflate it
+            self.bytes = max(tracemalloc.get_traced_memory()[1] - self._memory, 0)
+        _record(self)
+        return False
+
+
+def stage(name, rows=None):
+    if not ENABLED:
+        return _NOOP
+    return _Stage(name, rows)
+
+
+def _record(entry):
+    with _lock:
+        window = _windows.get(entry.name)
+        if window is None:
+            window = _windows[entry.name] = deque(maxlen=config.METRICS_WINDOW)
+        window.append((entry.seconds, entry.rows, entry.bytes))
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is not None:
+        rerun['stages'].append({'stage': entry.name, 'ms': entry.seconds * 1000, 'rows': entry.rows, 'bytes': entry.bytes})
+
+
+def start_rerun():
+    if not ENABLED:
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _local.rerun = {'started': time.time(), 'start': time.perf_counter(), 'stages': []}
+
+
+def finish_rerun(page):
+    # Emits one structured line per rerun and returns it for the debug panel
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return None
+    _local.rerun = None
+    record = {
+        'page': page,
+        'started': rerun['started'],
+        'total_ms': (time.perf_counter() - rerun['start']) * 1000,
+        'stages': rerun['stages'],
+    }
+    line = json.dumps(record)
+    logger.info(line)
+    if config.METRICS_FILE:
+        with _lock, open(config.METRICS_FILE, 'a') as f:
+            f.write(line + '\n')
+    return record
+
+
+def summary():
+    # Rolling percentiles per stage across every session in this process
+    import numpy as np
+    import pandas as pd
+
+    with _lock:
+        windows = {name: list(window) for name, window in _windows.items()}
+    rows = []
+    for name, samples in windows.items():
+        milliseconds = np.array([sample[0] for sample in samples]) * 1000
+        allocated = [sample[2] for sample in samples if sample[2] is not None]
+        rows.append({
+            'stage': name,
+            'samples': len(samples),
+            'p50 ms': np.percentile(milliseconds, 50),
+            'p95 ms': np.percentile(milliseconds, 95),
+            'p99 ms': np.percentile(milliseconds, 99),
+            'max ms': milliseconds.max(),
+            'median peak KiB': np.median(allocated) / 1024 if allocated else None,
+        })
+    return pd.DataFrame(rows)
@@ -1,41 +1,55 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
-import hashlib
-import plotly.express as px
+import catalog
+import config
+import content
+import instrumentation
+import warmup
+from instrumentation import stage
 
-
-df = pd.read_csv('drug_effectiveness_realistic_null_weight_data.csv')
-conn=sqlite3.connect('drug_effectiveness_realistic_null_weight_data.db')
-df.to_sql("drug_effectiveness_realistic_null_weight_data", conn, if_exists="replace", index=False)
-cursor=conn.cursor()
-
-# Load Data
-
-# Data Cleaning (Handle Nulls)
-df = df.dropna()
+instrumentation.start_rerun()
 
 # Navbar and Page Selection
-page = st.sidebar.radio("Navigation", ["Home", "Symptoms","Precautions"])
+page = st.sidebar.radio("Navigation", ["Home", "Symptoms","Precautions"], key="page")
 
 if page == "Home":
+    # Only the Home page needs pandas, the data stack and Plotly, so only it imports them
+    import pandas as pd
+    import auth
+    import charts
+    from backends import open_dataset
+    from store import TABLE_COLUMNS
+    from aggregates import get_cube
+    from filter_engine import FilterSpec, filter_rows
+    from patient_table import PAGE_SIZES, fetch_page
+    from export import FORMATS, available_formats, export_loader
+
+    # Load Data (CSV + SQLite or Parquet, see config.BACKEND); cached per data version
+    dataset = open_dataset()
+
     # Main Page
     st.title('Drug Effectiveness Analysis Dashboard')
 
+    # Pre-aggregated (Condition, Gender, Age, Drug) cube for this data version
+    with stage('cube'):
+        cube = get_cube(dataset)
+
     # Sidebar Filters
     st.sidebar.header('Filters')
-    age_filter = st.sidebar.slider('Age Range', min(df['Age']), max(df['Age']), (min(df['Age']), max(df['Age'])))
-    gender_filter = st.sidebar.selectbox('Gender', df['Gender'].unique())
-    condition_filter = st.sidebar.selectbox('Condition', df['Condition'].unique()) #Single select
-    # Apply Filters
-    filtered_df = df[
-        (df['Age'] >= age_filter[0]) & (df['Age'] <= age_filter[1]) &
-        (df['Gender']==gender_filter if gender_filter else True) &
-        (df['Condition'] == condition_filter if condition_filter else True)
-    ]
-
-    # Calculate Average Recovery Rate by Drug
-    drug_recovery = filtered_df.groupby('Drug')['Recovery Rate'].mean().reset_index()
+    age_filter = st.sidebar.slider('Age Range', float(cube.age_min), float(cube.age_max), (float(cube.age_min), float(cube.age_max)))
+    gender_filter = st.sidebar.selectbox('Gender', cube.genders)
+    condition_filter = st.sidebar.selectbox('Condition', cube.conditions) #Single select
+    # Apply Filters (one cached result per filter spec and data version)
+    filter_spec = FilterSpec.home(age_filter, gender_filter, condition_filter)
+    with stage('filter') as timing:
+        filtered_df = filter_rows(dataset, filter_spec)
+        timing.rows = len(filtered_df)
+
+    with stage('summary') as timing:
+        summary = cube.query(age_filter, gender_filter, condition_filter)
+        timing.rows = summary.count
+
+        # Calculate Average Recovery Rate by Drug
+        drug_recovery = summary.drug_recovery()
 
     # Find the Most Effective Drug(s)
     if not drug_recovery.empty:
@@ -45,38 +59,41 @@ if page == "Home":
     else:
         st.write("No data available for the selected filters.")
     #Filtered patient data
-    query=f"""
-    SELECT PatientID,Drug,Age,Gender,Condition,[Blood Type]
-    FROM drug_effectiveness_realistic_null_weight_data 
-    WHERE Age BETWEEN ? AND ?
-    AND Gender=?
-    AND Condition=?
-    AND PatientID IS NOT NULL
-    AND Drug IS NOT NULL
-    AND Age IS NOT NULL
-    AND Gender IS NOT NULL
-    AND Condition IS NOT NULL
-    AND [Dosage (mg)] IS NOT NULL
-    AND [Treatment Duration (days)] IS NOT NULL
-    AND [Recovery Rate] IS NOT NULL
-    AND [Side Effects] IS NOT NULL
-    AND [Weight (kg)] IS NOT NULL
-    AND [Blood Type] IS NOT NULL
-    """
-    #Get Data
-    df=pd.read_sql_query(query,conn,params=(age_filter[0],age_filter[1],gender_filter,condition_filter))
-    #Display
     st.subheader("Filtered Patient Data")
-    st.dataframe(df)
-    conn.close()
+    if config.TABLE_PAGINATE:
+        # Only the visible page is queried and sent to the browser; sorting happens in the query
+        sort_col, order_col, size_col = st.columns(3)
+        sort_by = sort_col.selectbox("Sort by", TABLE_COLUMNS)
+        descending = order_col.selectbox("Order", ["Ascending", "Descending"]) == "Descending"
+        page_sizes = sorted(set(PAGE_SIZES + [config.TABLE_PAGE_SIZE]))
+        page_size = size_col.selectbox("Rows per page", page_sizes, index=page_sizes.index(config.TABLE_PAGE_SIZE))
+        # Cursor of every page visited so far; back to page one when the query changes
+        table_key = (filter_spec, sort_by, descending, page_size, dataset.version)
+        if st.session_state.get('table_key') != table_key:
+            st.session_state.table_key = table_key
+            st.session_state.table_cursors = [None]
+        table_cursors = st.session_state.table_cursors
+        with stage('table') as timing:
+            page_df, next_cursor = fetch_page(dataset, filter_spec, sort_by, descending, table_cursors[-1], page_size)
+            timing.rows = len(page_df)
+            first_row = (len(table_cursors) - 1) * page_size
+            st.dataframe(page_df.set_index(pd.RangeIndex(first_row, first_row + len(page_df))))
+        prev_col, count_col, next_col = st.columns([1, 4, 1])
+        prev_col.button("Previous", disabled=len(table_cursors) == 1, on_click=table_cursors.pop)
+        next_col.button("Next", disabled=next_cursor is None, on_click=table_cursors.append, args=(next_cursor,))
+        if summary.count:
+            count_col.caption(f"Rows {first_row + 1:,}-{first_row + len(page_df):,} of {summary.count:,}")
+    else:
+        with stage('table', rows=len(filtered_df)):
+            st.dataframe(dataset.legacy(filtered_df[TABLE_COLUMNS]).reset_index(drop=True))
     # Summary Statistics
     st.header('Summary Statistics')
     col1, col2, col3, col4 = st.columns(4)
-    if not filtered_df.empty:
-        col1.metric("Average Recovery Rate", f"{filtered_df['Recovery Rate'].mean():.2f}")
-        col2.metric("Average Treatment Duration", f"{filtered_df['Treatment Duration (days)'].mean():.1f} Days")
-        col3.metric("Average Dosage", f"{filtered_df['Dosage (mg)'].mean():.1f} mg")
-        col4.metric("Total Patients", f"{len(filtered_df)}")
+    if not summary.empty:
+        col1.metric("Average Recovery Rate", f"{summary.mean('Recovery Rate'):.2f}")
+        col2.metric("Average Treatment Duration", f"{summary.mean('Treatment Duration (days)'):.1f} Days")
+        col3.metric("Average Dosage", f"{summary.mean('Dosage (mg)'):.1f} mg")
+        col4.metric("Total Patients", f"{summary.count}")
     else:
         st.write("No data to show summary statistics.")
 
@@ -85,36 +102,30 @@ if page == "Home":
 
     # Recovery Rate by Drug
     if not drug_recovery.empty:
-        fig_recovery = px.bar(drug_recovery, x='Drug', y='Recovery Rate', title='Average Recovery Rate by Drug')
-        st.plotly_chart(fig_recovery)
+        with stage('chart_recovery_bar', rows=len(drug_recovery)):
+            st.plotly_chart(charts.recovery_bar(dataset, filter_spec, drug_recovery))
     else:
         st.write("No data to show recovery rate graph.")
 
     # Side Effect Distribution
-    if not filtered_df.empty:
-        fig_side_effects = px.pie(filtered_df['Side Effects'].value_counts().reset_index(), names='Side Effects', values='count', title='Side Effect Distribution')
-        st.plotly_chart(fig_side_effects)
+    if not summary.empty:
+        with stage('chart_side_effects'):
+            st.plotly_chart(charts.side_effect_pie(dataset, filter_spec, summary.side_effect_counts()))
     else:
         st.write("No data to show side effect graph.")
 
-    # Age vs. Recovery Rate
+    # Age vs. Recovery Rate (WebGL or binned for large results, see config.py)
     if not filtered_df.empty:
-        fig_age_recovery = px.scatter(filtered_df, x='Age', y='Recovery Rate', color='Drug', title='Age vs. Recovery Rate')
-        st.plotly_chart(fig_age_recovery)
+        with stage('chart_age_recovery', rows=len(filtered_df)):
+            st.plotly_chart(charts.age_recovery_scatter(dataset, filter_spec, filtered_df))
     else:
         st.write("No data to show Age vs Recovery graph.")
     #------------------------------------------------------
-    df = pd.read_csv('credential_database.csv')  # Make sure this file exists
-    conn = sqlite3.connect('credential_database.db')
-    df.to_sql("credential_database", conn, if_exists="replace", index=False)
-    conn.commit()
-    
-
     # --- Initialize Session State ---
     if 'show_login' not in st.session_state:
         st.session_state.show_login = False
-    if 'authenticated' not in st.session_state:
-        st.session_state.authenticated = False
+    # Signed token from auth.issue_token(); checking it needs no database round trip
+    authenticated = auth.token_user(st.session_state.get('auth_token')) is not None
 
     # --- UI: Start Download Flow ---
     st.subheader("Download Filtered Data")
@@ -123,7 +134,7 @@ if page == "Home":
         st.session_state.show_login = True
 
     # --- UI: Login Form ---
-    if st.session_state.show_login and not st.session_state.authenticated:
+    if st.session_state.show_login and not authenticated:
         username = st.text_input("Username")
         password = st.text_input("Password", type="password")
 
@@ -131,29 +142,27 @@ if page == "Home":
             if username == "" or password == "":
                 st.warning("Please enter credentials and press submit.")
             else:
-                # --- Connect to the SQLite DB ---
-                conn = sqlite3.connect('credential_database.db')
-                cursor = conn.cursor()
-
-                # --- SQL Query to Validate Credentials ---
-                query = "SELECT * FROM credential_database WHERE username=? AND password=?"
-                cursor.execute(query, (username, password))
-                user = cursor.fetchone()
-                conn.close()
+                # --- Verify the salted hash on the auth worker pool ---
+                with stage('credential_check'):
+                    user = auth.verify_async(username, password).result()
 
                 if user:
                     st.success("Login successful.")
-                    st.session_state.authenticated = True
+                    st.session_state.auth_token = auth.issue_token(username)
+                    authenticated = True
                 else:
                     st.error("Invalid credentials. Please try again.")
 
     # --- UI: Download Button After Login ---
-    if st.session_state.authenticated:
+    if authenticated:
+        # Export is only built when the button is clicked, then served from the export cache
+        export_format = st.selectbox("Format", available_formats())
+        extension, mime = FORMATS[export_format]
         st.download_button(
-            label="Download CSV",
-            data=filtered_df.to_csv(index=False).encode('utf-8'),
-            file_name='filtered_data.csv',
-            mime='text/csv',
+            label=f"Download {export_format}",
+            data=export_loader(dataset, filter_spec, filtered_df, export_format),
+            file_name=f'filtered_data.{extension}',
+            mime=mime,
         )
 #------------------------------------------------------------------------------------------             
 elif page == "Precautions":
@@ -162,134 +171,14 @@ elif page == "Precautions":
     st.title('Precautions for Condition')
 
     # Condition Selection for Precautions Page
-    condition_filter_precautions = st.selectbox('Select Condition', df['Condition'].unique()) #Single select
+    condition_filter_precautions = st.selectbox('Select Condition', catalog.conditions()) #Single select
 
     if condition_filter_precautions:
-        condition = condition_filter_precautions
-        if condition == 'Hypertension':
-            st.image("hypertension.png", caption="Hypertension Precautions", use_container_width=True)
-            st.write("Precautions for Hypertension:")
-            st.markdown("""
-                        •	Eat a healthy diet. Choose healthy meal and snack options to help you avoid high blood pressure and its complications.<br>
-                        •	Keep yourself at a healthy weight.<br>
-                        •	Be physically active.<br>
-                        •	Do not smoke.<br>
-                        •	Limit how much alcohol you drink.<br> 
-                        •	Get enough sleep.<br> 
-                        •	Manage stress.""",unsafe_allow_html=True)
-                        
-            st.write("[Learn more](https://www.heart.org/en/health-topics/high-blood-pressure/changes-you-can-make-to-manage-high-blood-pressure)")
-        elif condition == 'Diabetes':
-            st.image("diabetes.png", caption="Diabetes Precautions", use_container_width=True)
-            st.write("Precautions for Diabetes: ")
-            st.markdown(""" •	Choose drinks without added sugar. <br>
-                            •	Choose higher fibre carbs. <br>
-                            •	Cut down on red and processed meat. <br>
-                            •	Eat plenty of fruits and vegetables. <br>
-                            •	Be sensible with alcohol.<br> 
-                            •	Monitor blood sugar.<br>
-                            •	Eat balanced meals.<br>
-                            •	Exercise.<br>
-                            •	Take prescribed medications.""",unsafe_allow_html=True)
-            st.write("[Learn more](https://www.diabetes.org/diabetes)")
-        elif condition == 'Depression':
-            st.image("depression.png", caption="Depression Precautions", use_container_width=True)
-            st.write("Precautions for Depression: ")
-            st.markdown(""" 
-                           •	Seek professional help.<br>
-                           •	Engage in therapy. <br>
-                           •	Maintain a healthy lifestyle.<br>
-                           •	Get enough sleep.<br>
-                           •	Avoid alcohol and drug use.<br>
-                           •	Exercise regularly.<br>
-                           •	Build strong relationships.<br>
-                           •	Reduce stress.""",unsafe_allow_html=True)
-            st.write("[Learn more](https://www.nimh.gov/health/topics/depression)")
-        elif condition == 'Asthma':
-            st.image("asthma.png", caption="Asthma Precautions", use_container_width=True)
-            st.write("Precautions for Asthma: ")
-            st.markdown(""" 
-                        •	Follow your asthma action plan.<br>
-                        •	Get vaccinated for influenza and pneumonia. <br>
-                        •	Identify and avoid asthma triggers. <br>
-                        •	Monitor your breathing.<br>
-                        •	Identify and treat attacks early. <br>
-                        •	Take your medication as prescribed. <br>
-                        •	Pay attention to increasing quick-relief inhaler use.""",unsafe_allow_html=True)
-            st.write("[Learn more](https://www.cdc.gov/asthma/default.htm)")
-        elif condition == 'GERD':
-            st.image("gerd.png", caption="GERD Precautions", use_container_width=True)
-            st.write("Precautions for GERD: ")
-            st.markdown("""
-                            •	Maintain a healthy weight. <br>
-                            •	Stop smoking.<br>
-                            •	Elevate the head of your bed. <br>
-                            •	Start on your left side. <br>
-                            •	Don't lie down after a meal.<br> 
-                            •	Eat food slowly and chew thoroughly. <br>
-                            •	Don't consume foods and drinks that trigger reflux. <br>
-                            •	Don't wear tight-fitting clothing""",unsafe_allow_html=True)
-            st.write("[Learn more](https://www.niddk.nih.gov/health-information/digestive-diseases/acid-reflux-ger-gerd)")
-        elif condition == 'High Cholesterol':
-            st.image("cholesterol.png", caption="High Cholesterol Precautions", use_container_width=True)
-            st.write("Precautions for High Cholesterol: ")
-            st.markdown(""" 
-                           •	Eat a diet that focuses on lean protein, fruits, vegetables and whole grains. <br>
-                           •	Also limit the amount of saturated and trans fats you eat. <br>
-                           •	Lose extra weight and keep it off.<br>
-                           •	If you smoke, ask your care team to help you quit.<br>
-                           •	Exercise on most days of the week for at least 30 minutes.<br>
-                           •	Take prescribed medication.<br>
-                           •	Quit smoking.""",unsafe_allow_html=True)
-            st.write("[Learn more](https://www.heart.org/en/health-topics/cholesterol)")
-        elif condition == 'Infection':
-            st.image("infection.png", caption="Infection Precautions", use_container_width=True)
-            st.write("Precautions for Infection: ")
-            st.markdown("""  
-                           •	Hand hygiene.<br>
-                           •	Use of personal protective equipment (e.g., gloves, masks, eyewear)<br>
-                           •	Respiratory hygiene / cough etiquette.<br>
-                           •	Use hand sanitizer when needed.<br>
-                           •	Wear a mask in crowded places.<br>
-                           •	Eat a balanced diet.<br>
-                           •	Stay hydrated.<br>
-                           •	Exercise regularly.<br>
-                           •	Get enough sleep.""",unsafe_allow_html=True)
-            st.write("[Learn more](https://www.cdc.gov/infections/index.html)")
-        elif condition == 'Thyroid Disorder':
-            st.image("thyroid.png", caption="Thyroid Precautions", use_container_width=True)
-            st.write("Precautions for Thyroid Disorder: ")
-            st.markdown("""  
-                           •	Eat a balanced diet. <br>
-                           •	Avoid processed foods.<br>
-                           •	Monitor your iodine intake. <br>
-                           •	Manage stress.<br>
-                           •	Exercise regularly.<br> 
-                           •	Get sufficient sleep.<br>
-                           •	Limit environmental toxins.<br>
-                           •	Take prescribed medication.""",unsafe_allow_html=True)
-            st.write("[Learn more](https://www.niddk.nih.gov/health-information/endocrine-diseases/thyroid-disease)")
-        elif condition == 'Pain':
-            st.image("pain.png", caption="Pain Precautions", use_container_width=True)
-            st.write("Precautions for Pain: Manage pain with medications, physical therapy, rest, use heat or cold packs, and practice relaxation techniques.")
-            st.markdown("""  
-                           •	Proper Medication Use.<br>
-                           •	Rest and Relaxation.<br>
-                           •	Physical Therapy & Exercise.<br>
-                           •	Maintain a Healthy Diet.<br>
-                           •	Maintain a healthy weight.""",unsafe_allow_html=True)
-            st.write("[Learn more](https://www.mayoclinic.org/symptom-checker/pain-in-adults-adults/related-factors/itt-20072044)")
-        elif condition == 'Allergies':
-            st.image("allergies.png", caption="Allergies Precautions", use_container_width=True)
-            st.write("Precautions for Allergies: Avoid allergens, take prescribed medications, carry an epinephrine auto-injector, monitor symptoms, and inform others about your allergies.")
-            st.markdown("""  
-                           •	Avoid your allergens. This is very important but not always easy. <br>
-                           •	Take your medicines as prescribed. <br>
-                           •	If you are at risk for anaphylaxis, keep your epinephrine auto-injectors with you at all times. <br>
-                           •	Keep a diary. <br>
-                           •	Wear a medical alert bracelet (or necklace). <br>
-                           •	Know what to do during an allergic reaction.""",unsafe_allow_html=True)
-            st.write("[Learn more](https://www.cdc.gov/nchs/fastats/allergies.htm)")
+        # Text, links and image per condition come from the content registry (conditions.json)
+        item = content.entry('precautions', condition_filter_precautions)
+        if item is not None:
+            with stage('content'):
+                content.render(st, item)
         else:
             st.write("Precautions for this condition are not yet available.")
     else:
@@ -302,127 +191,40 @@ elif page == "Symptoms":
     st.title('Symptoms for Condition')
 
     # Condition Selection for Precautions Page
-    condition_filter_symptoms = st.selectbox('Select Condition', df['Condition'].unique()) #Single select
+    condition_filter_symptoms = st.selectbox('Select Condition', catalog.conditions()) #Single select
 
     if condition_filter_symptoms:
-        condition = condition_filter_symptoms
-        if condition == 'High Cholesterol':
-            st.image("cholesterol2.jpg", caption="High Cholesterol Symptoms", use_container_width=True)
-            st.write("High cholesterol has no symptoms. A blood test is the only way to find out if you have it.")
-            st.write("A very few people with High Cholesterol may have:")
-            st.markdown("""
-                        • Fatty Deposits on Skin.<br>
-                        • Unusual Chest Pain.<br>
-                        • Shortness of Breath.<br>
-                        • Frequent Headaches.""",unsafe_allow_html=True)
-        
-        elif condition == 'Diabetes':
-            st.image("diabetes2.jpg", caption="Diabetes Symptoms", use_container_width=True)
-            st.write(" Some of the symptoms of diabetes are:")
-            st.markdown(""" 
-                        •	Feeling more thirsty than usual.<br>
-                        •	Urinating often.<br>
-                        •	Losing weight without trying.<br>
-                        •	Presence of ketones in the urine. Ketones are a byproduct of the breakdown of muscle and fat that happens when there's not enough available insulin.<br>
-                        •	Feeling tired and weak.<br>
-                        •	Feeling irritable or having other mood changes.<br>
-                        •	Having blurry vision.<br>
-                        •	Having slow-healing sores.<br>
-                        •	Getting a lot of infections, such as gum, skin and vaginal infections. """,unsafe_allow_html=True)
-        elif condition == 'Depression':
-            st.image("depression2.jpg", caption="Depression Symptoms", use_container_width=True)
-            st.write("The symptoms of depression vary from person to person, but they commonly include:")
-            st.markdown(""" 
-                    •	sadness<br>
-                    •	hopelessness<br>
-                    •	loss of pleasure in activities<br>
-                    •	irritability<br>
-                    •	tiredness<br>
-                    •	appetite changes<br>
-                    •	thoughts of death or suicide """,unsafe_allow_html=True)
-            
-        elif condition == 'Asthma':
-            st.image("asthma2.jpg", caption="Asthma Symptoms", use_container_width=True)
-            st.write("Asthma signs and symptoms include:")
-            st.markdown(""" 
-                        •	Shortness of breath.<br>
-                        •	Chest tightness or pain.<br>
-                        •	Wheezing when exhaling, which is a common sign of asthma in children.<br>
-                        •	Trouble sleeping caused by shortness of breath, coughing or wheezing.<br>
-                        •	Coughing or wheezing attacks that are worsened by a respiratory virus, such as a cold or the flu.""",unsafe_allow_html=True)
-        elif condition == 'GERD':
-            st.image("GERD2.jpg", caption="GERD symptoms", use_container_width=True)
-            st.write("Common symptoms of GERD include:")
-            st.markdown("""
-                        •	A burning sensation in the chest, often called heartburn. Heartburn usually happens after eating and might be worse at night or while lying down.<br>
-                        •	Backwash of food or sour liquid in the throat.<br>
-                        •	Upper belly or chest pain.<br>
-                        •	Trouble swallowing, called dysphagia.<br>
-                        •	Sensation of a lump in the throat.  """,unsafe_allow_html=True)
-        elif condition == 'Hypertension':
-            st.image("hypertension2.jpeg", caption="Hypertension Symptoms", use_container_width=True)
-            st.write("Most people with high blood pressure have no symptoms, even if blood pressure readings reach dangerously high levels. You can have high blood pressure for years without any symptoms.")
-            st.write("A few people with high blood pressure may have:")
-            st.markdown("""  
-                       •	Headaches<br>
-                       •	Shortness of breath<br>
-                       •	Nosebleeds<br>
-                       •	Dizziness<br>
-                       •	Weakness """,unsafe_allow_html=True)
-            st.write("However, these symptoms aren't specific. They usually don't occur until high blood pressure has reached a severe or life-threatening stage.")
-        elif condition == 'Infection':
-            st.image("infection3.jpg", caption="Infection Symptoms", use_container_width=True)
-            st.write("Signs and symptoms of a bacterial infection may vary depending on the location of the infection and the type of bacteria that’s causing it.")
-            st.write("However, some general symptoms of a bacterial infection include:")
-            st.markdown(""" 
-                        •	fever<br>
-                        •	feeling tired or fatigued<br>
-                        •	swollen lymph nodes in the neck, armpits, or groin<br>
-                        •	headache<br>
-                        •	nausea or vomiting """,unsafe_allow_html=True)
-
-        elif condition == 'Thyroid Disorder':
-            st.image("thyroid2.jpg", caption="Thyroid Symptoms", use_container_width=True)
-            st.write("Symptoms and signs of hyperthyroidism:")
-            st.markdown("""
-                        •	Nervousness, tremor, agitation<br>
-                        •	Irritability<br>
-                        •	Poor concentration<br>
-                        •	Reduced menstrual blood flow in women<br>
-                        •	Racing heartbeat<br>
-                        •	Heat intolerance<br>
-                        •	Changes in bowel habits, such as more frequent bowel movements<br>
-                        •	Enlargement of the thyroid gland<br>
-                        •	Skin thinning<br>
-                        •	Brittle hair<br>
-                        •	Increase in appetite, feeling hungry<br>
-                        •	Sweating  """,unsafe_allow_html=True)
-        elif condition == 'Pain':
-            st.image("pain2.jpg", caption="Pain symptoms", use_container_width=True)
-            st.write("Pain can manifest in different ways depending on its cause, location, and severity. Common symptoms of pain include:")
-            st.markdown("""
-                        •	Sharp, stabbing pain<br>
-                        •	Dull, aching pain<br>
-                        •	Burning sensation<br>
-                        •	Stiffness or restricted movement<br>
-                        •	Swelling or inflammation<br>
-                        •	Increased sensitivity to touch<br>
-                        •	Irritability or mood changes<br>
-                        •	Fatigue or trouble sleeping<br>
-                        •	Loss of appetite""",unsafe_allow_html=True)
-        elif condition == 'Allergies':
-            st.image("allergies2.jpg", caption="Allergies symptoms", use_container_width=True)
-            st.write("No matter what you're allergic to, the symptoms can be similar.")
-            st.write("Common symptoms of skin allergies include:")
-            st.markdown(""" 
-                        •	Rash<br>
-                        •	Itch<br>
-                        •	Redness<br>
-                        •	Swelling<br>
-                        •	Bumps<br>
-                        •	Flaky skin<br>
-                        •	Cracked skin""",unsafe_allow_html=True)
+        item = content.entry('symptoms', condition_filter_symptoms)
+        if item is not None:
+            with stage('content'):
+                content.render(st, item)
         else:
             st.write("Precautions for this condition are not yet available.")
     else:
-        st.write("Please select a condition to view precautions.")
\ No newline at end of file
+        st.write("Please select a condition to view precautions.")
+
+# --- Performance panel (DASHBOARD_INSTRUMENTATION=1) ---
+rerun_metrics = instrumentation.finish_rerun(page)
+if rerun_metrics is not None:
+    import pandas as pd
+    import assets
+    import charts
+    import data_loader
+    import db_pool
+    import filter_engine
+    with st.sidebar.expander("Performance"):
+        st.caption(f"This rerun: {rerun_metrics['total_ms']:.1f} ms")
+        st.dataframe(pd.DataFrame(rerun_metrics['stages']), hide_index=True)
+        st.caption("All sessions, rolling window")
+        st.dataframe(instrumentation.summary().round(2), hide_index=True)
+        st.caption("SQLite connection pools")
+        st.dataframe(pd.DataFrame(db_pool.pool_stats()).round(2), hide_index=True)
+        st.caption("Dataset loader (this process)")
+        loader_stats = data_loader.cache_stats()
+        st.dataframe(pd.DataFrame([{key: value for key, value in loader_stats.items() if key != 'datasets'}]).round(3), hide_index=True)
+        st.caption("Shared caches (this process)")
+        shared_caches = [('filtered rows', filter_engine), ('figures', charts), ('images', assets)]
+        st.dataframe(pd.DataFrame([{'cache': name, **module.cache_stats()} for name, module in shared_caches]), hide_index=True)
+
+# Preload data, figures and images in the background once this process has served a page
+warmup.start()
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+import config
+import store
+from data_loader import TEXT_DTYPE, Dataset
+from filter_engine import filter_rows
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def _display_dtypes(dataset):
+    # The store returns SQLite types; show the columns the way read_csv would have
+    return dataset.legacy_dtypes if dataset.compact else dataset.dtypes
+
+
+def _store_page(dataset, spec, sort_by, descending, after, page_size):
+    store.ensure_store(dataset)
+    page, next_cursor = store.page_patients(
+        spec.age_range, spec.value('Gender'), spec.value('Condition'),
+        sort_by, descending, after, page_size,
+    )
+    dtypes = _display_dtypes(dataset)
+    return page.astype({column: dtypes[column] for column in page.columns if column in dtypes}), next_cursor
+
+
+def _sort_key(series):
+    # Categories compare by code, not by value, so sort on the values themselves
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(TEXT_DTYPE)
+    return series
+
+
+def _frame_page(dataset, spec, sort_by, descending, after, page_size):
+    # Backends without the SQLite store: the same keyset walk over the cached filtered frame
+    frame = filter_rows(dataset, spec)
+    keys = pd.DataFrame({'sort': _sort_key(frame[sort_by]), 'id': _sort_key(frame['PatientID'])}, index=frame.index)
+    if after is not None:
+        value, patient = after
+        if descending:
+            keys = keys[(keys['sort'] < value) | ((keys['sort'] == value) & (keys['id'] < patient))]
+        else:
+            keys = keys[(keys['sort'] > value) | ((keys['sort'] == value) & (keys['id'] > patient))]
+    keys = keys.sort_values(['sort', 'id'], ascending=not descending, kind='stable').iloc[:page_size + 1]
+    page = dataset.legacy(frame.loc[keys.index[:page_size], store.TABLE_COLUMNS])
+    next_cursor = None
+    if len(keys) > page_size:
+        last = keys.iloc[page_size - 1]
+        next_cursor = tuple(value.item() if isinstance(value, np.generic) else value for value in last)
+    return page, next_cursor
+
+
+def fetch_page(dataset, spec, sort_by='PatientID', descending=False, after=None, page_size=None):
+    # One page of the Home table plus the cursor for the next one (None on the last page)
+    page_size = page_size or config.TABLE_PAGE_SIZE
+    if isinstance(dataset, Dataset):
+        return _store_page(dataset, spec, sort_by, descending, after, page_size)
+    return _frame_page(dataset, spec, sort_by, descending, after, page_size)
@@ -0,0 +1,208 @@
+import argparse
+import io
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import config
+from aggregates import CUBE_COLUMNS, Cube, cells, merge_cells
+from data_loader import CATEGORICAL_COLUMNS, file_hash
+
+# Complete rows are read in shards of at least this many bytes of CSV
+MIN_SHARD_BYTES = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+def parse_age_bands(text):
+    # '0-17,18-64,65-120' -> [(0, 17), (18, 64), (65, 120)]
+    bands = []
+    for part in text.split(','):
+        low, high = part.split('-')
+        bands.append((float(low), float(high)))
+    return bands
+
+
+def _csv_shards(path, count):
+    # Byte ranges that start right after a newline, so each one parses on its own
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        offsets = [f.tell()]
+        step = max((size - offsets[0]) // count, MIN_SHARD_BYTES)
+        while offsets[-1] + step < size:
+            f.seek(offsets[-1] + step)
+            f.readline()
+            if f.tell() >= size:
+                break
+            offsets.append(f.tell())
+    offsets.append(size)
+    return [('csv', path, start, stop) for start, stop in zip(offsets, offsets[1:])]
+
+
+def _parquet_shards(path):
+    import pyarrow.dataset as ds
+
+    return [('parquet', path, fragment.path) for fragment in ds.dataset(path, format='parquet', partitioning='hive').get_fragments()]
+
+
+def _shard_cells(shard):
+    # Cube cells for the complete rows of one shard; runs in a worker process
+    if shard[0] == 'csv':
+        _, path, start, stop = shard
+        with open(path, 'rb') as f:
+            columns = list(pd.read_csv(f, nrows=0).columns)
+            f.seek(start)
+            data = f.read(stop - start)
+        frame = pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=dict.fromkeys(CATEGORICAL_COLUMNS, 'category'))
+        frame = frame.dropna()
+    else:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        _, root, fragment = shard
+        # Typed explicitly: a lone null-Condition partition gives nothing to infer it from
+        partitioning = ds.partitioning(pa.schema([('Condition', pa.string())]), flavor='hive')
+        dataset = ds.dataset([fragment], format='parquet', partitioning=partitioning, partition_base_dir=root)
+        frame = dataset.to_table(columns=CUBE_COLUMNS, filter=ds.field('complete') == True).to_pandas()  # noqa: E712
+    return cells(frame[CUBE_COLUMNS])
+
+
+def _summary(cube, condition, gender, band):
+    # The Home page numbers for one Condition x Gender x age band
+    age_range = band or (cube.age_min, cube.age_max)
+    summary = cube.query(age_range, gender, condition)
+    drug_recovery = summary.drug_recovery()
+    best = drug_recovery[drug_recovery['Recovery Rate'] == drug_recovery['Recovery Rate'].max()]['Drug'].tolist()
+    return {
+        'Condition': condition,
+        'Gender': gender,
+        'Age From': age_range[0],
+        'Age To': age_range[1],
+        'Total Patients': summary.count,
+        'Average Recovery Rate': summary.mean('Recovery Rate') if summary.count else None,
+        'Average Treatment Duration': summary.mean('Treatment Duration (days)') if summary.count else None,
+        'Average Dosage': summary.mean('Dosage (mg)') if summary.count else None,
+        'Most Effective Drugs': best,
+        'Recovery Rate by Drug': drug_recovery.to_dict('records'),
+        'Side Effects': summary.side_effect_counts().to_dict('records'),
+    }
+
+
+def _chart_name(row, bands):
+    name = f"{row['Condition']}_{row['Gender']}"
+    if bands:
+        name += f"_{row['Age From']:g}-{row['Age To']:g}"
+    return re.sub(r'[^A-Za-z0-9_.-]+', '-', name) + '.html'
+
+
+def _write_plotlyjs(chart_dir):
+    # One local copy of plotly.js shared by every chart page, so they render offline
+    from plotly.offline import get_plotlyjs
+
+    with open(os.path.join(chart_dir, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+
+
+def _write_charts(path, row):
+    # The Home page bar and pie for one report row as an HTML page next to plotly.min.js
+    import plotly.io as pio
+
+    import charts
+
+    title = f"{row['Condition']}, {row['Gender']}, ages {row['Age From']:g}-{row['Age To']:g}"
+    figures = [
+        charts.build_recovery_bar(pd.DataFrame(row['Recovery Rate by Drug'], columns=['Drug', 'Recovery Rate'])),
+        charts.build_side_effect_pie(pd.DataFrame(row['Side Effects'], columns=['Side Effects', 'count'])),
+    ]
+    parts = [pio.to_html(fig, full_html=False, include_plotlyjs='directory' if i == 0 else False) for i, fig in enumerate(figures)]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<html><head><meta charset="utf-8"><title>{title}</title></head><body><h2>{title}</h2>')
+        f.write(''.join(parts))
+        f.write('</body></html>')
+    return path
+
+
+def _write_table(rows, out_dir, fmt, meta):
+    if fmt == 'json':
+        path = os.path.join(out_dir, 'report.json')
+        with open(path, 'w') as f:
+            json.dump({'meta': meta, 'rows': rows}, f, indent=1, default=float)
+        return path
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = os.path.join(out_dir, 'report.parquet')
+    table = pa.Table.from_pylist(rows)
+    table = table.replace_schema_metadata({'report': json.dumps(meta)})
+    pq.write_table(table, path, compression='zstd')
+    return path
+
+
+def run(out_dir, fmt='parquet', backend=None, age_bands=None, workers=None, write_charts=True):
+    backend = backend or config.BACKEND
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    if backend == 'csv':
+        source, version = config.DATA_FILE, file_hash(config.DATA_FILE)
+        shards = _csv_shards(source, workers * 4)
+        order = None
+    else:
+        from backends import directory_signature, read_meta
+
+        source, version = config.PARQUET_DIR, directory_signature(config.PARQUET_DIR)
+        shards = _parquet_shards(source)
+        order = read_meta(source).get('levels')
+
+    with ProcessPoolExecutor(workers) as pool:
+        # Scan: every worker turns its shards into cube cells, merged here into one cube
+        cube = Cube(*merge_cells(pool.map(_shard_cells, shards)), version, order)
+        scanned = time.perf_counter()
+        rows = [
+            _summary(cube, condition, gender, band)
+            for condition in cube.conditions
+            for gender in cube.genders
+            for band in (age_bands or [None])
+        ]
+        meta = {
+            'source': os.path.abspath(source),
+            'version': version,
+            'backend': backend,
+            'workers': workers,
+            'shards': len(shards),
+            'age_bands': age_bands,
+            'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        table_path = _write_table(rows, out_dir, fmt, meta)
+        if write_charts:
+            # Rendering is the other expensive part, so it is spread over the same workers
+            chart_dir = os.path.join(out_dir, 'charts')
+            os.makedirs(chart_dir, exist_ok=True)
+            _write_plotlyjs(chart_dir)
+            paths = [os.path.join(chart_dir, _chart_name(row, age_bands)) for row in rows if row['Total Patients']]
+            list(pool.map(_write_charts, paths, [row for row in rows if row['Total Patients']], chunksize=8))
+    logger.info(
+        "report: %d rows from %d shards in %.2fs (scan %.2fs) -> %s",
+        len(rows), len(shards), time.perf_counter() - start, scanned - start, table_path,
+    )
+    return table_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Home page summary for every Condition x Gender (x age band) combination.')
+    parser.add_argument('out', help='directory for report.parquet / report.json and charts/')
+    parser.add_argument('--format', choices=['parquet', 'json'], default='parquet')
+    parser.add_argument('--backend', choices=['csv', 'parquet'], default=config.BACKEND)
+    parser.add_argument('--age-bands', type=parse_age_bands, help="e.g. '0-17,18-64,65-120' (default: all ages)")
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+    parser.add_argument('--no-charts', action='store_true', help='skip the per-combination chart HTML files')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    print(run(args.out, args.format, args.backend, args.age_bands, args.workers, not args.no_charts), file=sys.stdout)
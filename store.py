@@ -0,0 +1,254 @@
+import logging
+import threading
+import time
+
+import pandas as pd
+
+import db_pool
+
+DB_FILE = 'drug_effectiveness_realistic_null_weight_data.db'
+TABLE = 'drug_effectiveness_realistic_null_weight_data'
+
+# Column name -> SQLite type, in source file order
+SCHEMA = [
+    ('PatientID', 'TEXT'),
+    ('Drug', 'TEXT'),
+    ('Age', 'INTEGER'),
+    ('Gender', 'TEXT'),
+    ('Condition', 'TEXT'),
+    ('Dosage (mg)', 'REAL'),
+    ('Treatment Duration (days)', 'INTEGER'),
+    ('Recovery Rate', 'REAL'),
+    ('Side Effects', 'TEXT'),
+    ('Weight (kg)', 'REAL'),
+    ('Blood Type', 'TEXT'),
+]
+COLUMNS = [name for name, _ in SCHEMA]
+TABLE_COLUMNS = ['PatientID', 'Drug', 'Age', 'Gender', 'Condition', 'Blood Type']
+# Rows read from the data file per insert batch when the store is rebuilt
+INGEST_CHUNK_ROWS = 100000
+
+logger = logging.getLogger(__name__)
+
+
+def _quote(name):
+    return f'[{name}]'
+
+
+def _migration_1(conn):
+    # Replace the untyped table pandas used to rewrite on every rerun
+    conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    columns = ',\n'.join(f"    {_quote(name)} {kind}" for name, kind in SCHEMA)
+    conn.execute(f"""
+    CREATE TABLE {TABLE} (
+{columns},
+    complete INTEGER NOT NULL
+    )""")
+    # Home page filter: complete rows for one condition, gender and age range
+    conn.execute(f"""
+    CREATE INDEX idx_complete_condition_gender_age
+    ON {TABLE} (Condition, Gender, Age)
+    WHERE complete = 1""")
+    conn.execute("CREATE TABLE dataset_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+
+def _migration_2(conn):
+    # Paged patient table: complete rows for one condition and gender in PatientID order
+    conn.execute(f"""
+    CREATE INDEX idx_complete_condition_gender_patient
+    ON {TABLE} (Condition, Gender, PatientID)
+    WHERE complete = 1""")
+    conn.execute("ANALYZE")
+
+
+def _migration_3(conn):
+    # Appends check new batches for PatientIDs that are already stored
+    conn.execute(f"CREATE INDEX idx_patient_id ON {TABLE} (PatientID)")
+
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version
+MIGRATIONS = [_migration_1, _migration_2, _migration_3]
+
+_lock = threading.Lock()
+_synced = {}
+
+
+def connect(db_path=DB_FILE):
+    # Pooled read-only connection: `with connect() as conn: ...`
+    return db_pool.reader(db_path)
+
+
+def migrate(conn):
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[current:], start=current + 1):
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            logger.info("applied schema migration %d", number)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def stored_version(conn):
+    row = conn.execute("SELECT value FROM dataset_meta WHERE key = 'data_version'").fetchone()
+    return row[0] if row else None
+
+
+def _rows(frame):
+    # Converted a column at a time: SQLite gets Python ints for INTEGER columns and NULL
+    # (None) where pandas has NaN/NA, plus the complete flag
+    frame = frame[COLUMNS]
+    present = frame.notna()
+    columns = {}
+    for name, kind in SCHEMA:
+        values = frame[name].astype('Int64') if kind == 'INTEGER' else frame[name]
+        columns[name] = values.astype(object).where(present[name], None)
+    columns['complete'] = present.all(axis=1).astype(int).astype(object)
+    return pd.DataFrame(columns).itertuples(index=False, name=None)
+
+
+def ingest(conn, frames, version):
+    # frames: the rows to store as an iterable of read_csv-layout frames, e.g. file chunks
+    placeholders = ', '.join('?' * (len(COLUMNS) + 1))
+    column_list = ', '.join(_quote(name) for name in COLUMNS)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Another process may have ingested this version while we waited for the lock
+        if stored_version(conn) != version:
+            # Bulk load without the indexes, then build each one in a single pass
+            indexes = conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (TABLE,),
+            ).fetchall()
+            for name, _ in indexes:
+                conn.execute(f"DROP INDEX {_quote(name)}")
+            conn.execute(f"DELETE FROM {TABLE}")
+            for frame in frames:
+                conn.executemany(
+                    f"INSERT INTO {TABLE} ({column_list}, complete) VALUES ({placeholders})",
+                    _rows(frame),
+                )
+            for _, sql in indexes:
+                conn.execute(sql)
+            conn.execute(
+                "INSERT OR REPLACE INTO dataset_meta (key, value) VALUES ('data_version', ?)",
+                (version,),
+            )
+            conn.execute("ANALYZE")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def append(conn, frame, previous_version, version):
+    # Insert only the rows added since previous_version; False if the store holds another version
+    placeholders = ', '.join('?' * (len(COLUMNS) + 1))
+    column_list = ', '.join(_quote(name) for name in COLUMNS)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = stored_version(conn)
+        if current not in (previous_version, version):
+            conn.execute("ROLLBACK")
+            return False
+        if current == previous_version:
+            conn.executemany(
+                f"INSERT INTO {TABLE} ({column_list}, complete) VALUES ({placeholders})",
+                _rows(frame),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO dataset_meta (key, value) VALUES ('data_version', ?)",
+                (version,),
+            )
+            conn.execute("PRAGMA optimize")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return True
+
+
+def existing_patient_ids(conn, ids):
+    # The subset of ids already in the store
+    ids = list(ids)
+    found = set()
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        query = f"SELECT PatientID FROM {TABLE} WHERE PatientID IN ({', '.join('?' * len(chunk))})"
+        found.update(row[0] for row in conn.execute(query, chunk))
+    return found
+
+
+def ensure_store(dataset, db_path=DB_FILE):
+    # Cheap on reruns: only touches the database when the data version moves
+    if _synced.get(db_path) == dataset.version:
+        return db_path
+    with _lock:
+        if _synced.get(db_path) == dataset.version:
+            return db_path
+        pool = db_pool.get_pool(db_path)
+        with pool.writer() as conn:
+            migrate(conn)
+            current = stored_version(conn)
+            ingested = current != dataset.version
+            start = time.perf_counter()
+            appended = False
+            if ingested and current is not None and current == getattr(dataset, 'previous_version', None):
+                # Rows were only appended to the file the store already holds
+                appended = append(conn, dataset.legacy(dataset.appended), current, dataset.version)
+                if appended:
+                    logger.info("appended %d rows to %s in %.3fs", len(dataset.appended), db_path, time.perf_counter() - start)
+            if ingested and not appended:
+                ingest(conn, dataset.raw_chunks(INGEST_CHUNK_ROWS), dataset.version)
+                logger.info("ingested %d rows into %s in %.3fs", dataset.rows, db_path, time.perf_counter() - start)
+        if ingested:
+            pool.checkpoint()
+        _synced[db_path] = dataset.version
+    return db_path
+
+
+def filter_clause(age_range, gender, condition):
+    clauses = ["complete = 1"]
+    params = []
+    if condition:
+        clauses.append("Condition = ?")
+        params.append(condition)
+    if gender:
+        clauses.append("Gender = ?")
+        params.append(gender)
+    clauses.append("Age BETWEEN ? AND ?")
+    params.extend(age_range)
+    return ' AND '.join(clauses), params
+
+
+def page_patients(age_range, gender, condition, sort_by='PatientID', descending=False, after=None,
+                  page_size=50, columns=TABLE_COLUMNS, db_path=DB_FILE):
+    # Keyset pagination on (sort_by, PatientID): `after` is the previous page's next_cursor.
+    # Returns (page, next_cursor); next_cursor is None on the last page.
+    if sort_by not in COLUMNS:
+        raise ValueError(f'Unknown sort column {sort_by!r}')
+    where, params = filter_clause(age_range, gender, condition)
+    keys = [_quote(sort_by), 'PatientID'] if sort_by != 'PatientID' else ['PatientID']
+    if after is not None:
+        after = after[:len(keys)]
+        where += f" AND ({', '.join(keys)}) {'<' if descending else '>'} ({', '.join('?' * len(keys))})"
+        params.extend(after)
+    direction = 'DESC' if descending else 'ASC'
+    selected = list(dict.fromkeys(list(columns) + [sort_by, 'PatientID']))
+    query = (
+        f"SELECT {', '.join(_quote(name) for name in selected)} FROM {TABLE} WHERE {where} "
+        f"ORDER BY {', '.join(f'{key} {direction}' for key in keys)} LIMIT ?"
+    )
+    with connect(db_path) as conn:
+        rows = conn.execute(query, params + [page_size + 1]).fetchall()
+    page = pd.DataFrame(rows[:page_size], columns=selected)
+    next_cursor = None
+    if len(rows) > page_size:
+        last = dict(zip(selected, rows[page_size - 1]))
+        next_cursor = (last[sort_by], last['PatientID'])
+    return page[list(columns)], next_cursor
@@ -0,0 +1,86 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import config
+from store import COLUMNS
+
+# Sampled as categories (missing values included as their own level)
+CATEGORICAL = ['Gender', 'Condition', 'Side Effects', 'Blood Type']
+# Resampled from the observed non-null values
+NUMERIC = ['Age', 'Dosage (mg)', 'Treatment Duration (days)', 'Weight (kg)']
+
+
+def _frequencies(series):
+    counts = series.value_counts(dropna=False, normalize=True)
+    return counts.index.to_numpy(dtype=object), counts.to_numpy()
+
+
+class Profile:
+    # Distributions of the real file the synthetic data is drawn from
+    def __init__(self, frame):
+        self.null_rates = frame.isna().mean().to_dict()
+        self.categorical = {column: _frequencies(frame[column]) for column in CATEGORICAL}
+        # Drug depends on Condition (each condition has its own drugs plus Placebo)
+        self.drug_by_condition = {
+            condition: _frequencies(group['Drug'])
+            for condition, group in frame.groupby('Condition', dropna=False)
+        }
+        self.numeric = {column: frame[column].dropna().to_numpy() for column in NUMERIC}
+        # Recovery Rate depends on Drug, so rankings look like the real ones
+        self.recovery_by_drug = {drug: group['Recovery Rate'].dropna().to_numpy() for drug, group in frame.groupby('Drug')}
+        self.recovery = frame['Recovery Rate'].dropna().to_numpy()
+
+    def sample(self, rows, start, id_width, rng):
+        frame = pd.DataFrame(index=np.arange(rows))
+        for column, (values, weights) in self.categorical.items():
+            frame[column] = rng.choice(values, size=rows, p=weights)
+
+        drugs = np.empty(rows, dtype=object)
+        conditions = frame['Condition'].to_numpy()
+        missing_condition = pd.isna(conditions)
+        for condition, (values, weights) in self.drug_by_condition.items():
+            rows_for = missing_condition if pd.isna(condition) else conditions == condition
+            drugs[rows_for] = rng.choice(values, size=int(rows_for.sum()), p=weights)
+        frame['Drug'] = drugs
+
+        for column, values in self.numeric.items():
+            frame[column] = rng.choice(values, size=rows)
+            frame.loc[rng.random(rows) < self.null_rates[column], column] = np.nan
+
+        recovery = np.empty(rows)
+        missing_drug = pd.isna(drugs)
+        recovery[missing_drug] = rng.choice(self.recovery, size=int(missing_drug.sum()))
+        for drug, values in self.recovery_by_drug.items():
+            rows_for = drugs == drug
+            recovery[rows_for] = rng.choice(values, size=int(rows_for.sum()))
+        recovery[rng.random(rows) < self.null_rates['Recovery Rate']] = np.nan
+        frame['Recovery Rate'] = recovery
+
+        ids = pd.Series([f'PID{number:0{id_width}d}' for number in range(start, start + rows)], dtype=object)
+        ids[rng.random(rows) < self.null_rates['PatientID']] = None
+        frame['PatientID'] = ids.to_numpy()
+        return frame[COLUMNS]
+
+
+def generate(out_path, rows, source=config.DATA_FILE, seed=0, chunk_rows=1000000):
+    # Writes `rows` rows with the source file's schema, a chunk at a time
+    profile = Profile(pd.read_csv(source))
+    rng = np.random.default_rng(seed)
+    id_width = max(5, len(str(rows - 1)))
+    with open(out_path, 'w', encoding='utf-8', newline='') as f:
+        for start in range(0, rows, chunk_rows):
+            chunk = profile.sample(min(chunk_rows, rows - start), start, id_width, rng)
+            chunk.to_csv(f, index=False, header=start == 0, lineterminator='\n')
+    return out_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic patient data shaped like the real dataset.')
+    parser.add_argument('out', help='CSV file to write')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--source', default=config.DATA_FILE, help='real CSV to profile')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate(args.out, args.rows, args.source, args.seed)
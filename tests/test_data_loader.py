@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_loader import file_hash, load_dataset  # noqa: E402
+
+SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'drug_effectiveness_realistic_null_weight_data.csv')
+
+
+@pytest.mark.parametrize('compact', [True, False])
+def test_append_split_across_loads(tmp_path, compact):
+    # A row that is still being written must not be parsed until its newline arrives
+    with open(SOURCE, 'rb') as f:
+        lines = f.readlines()
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b''.join(lines[:101]))
+    first = load_dataset(str(path), compact)
+
+    row = b'PID00120,Gabapentin,51,Male,Pain,70.5,30,0.8,Mild,70.1,O-\n'
+    with open(path, 'ab') as f:
+        f.write(row[:20])
+    partial = load_dataset(str(path), compact)
+    assert partial is first
+    assert partial.rows == 100
+
+    with open(path, 'ab') as f:
+        f.write(row[20:] + lines[101])
+    grown = load_dataset(str(path), compact)
+    assert grown.rows == 102
+    assert grown.previous_version == first.version
+    assert grown.version == file_hash(str(path))
+    new = grown.legacy(grown.appended).iloc[0]
+    assert (new['PatientID'], new['Drug'], new['Gender'], new['Condition']) == ('PID00120', 'Gabapentin', 'Male', 'Pain')
+    assert float(new['Age']) == 51
+
+
+def test_append_waits_for_the_row_end(tmp_path):
+    # Complete rows after the last load are taken, the unfinished one after them is not
+    with open(SOURCE, 'rb') as f:
+        lines = f.readlines()
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b''.join(lines[:51]))
+    load_dataset(str(path))
+    with open(path, 'ab') as f:
+        f.write(lines[51] + lines[52][:15])
+    grown = load_dataset(str(path))
+    assert grown.rows == 51
+    assert grown.offset == sum(len(line) for line in lines[:52])
+    assert grown.version == file_hash(str(path), grown.offset)
+
+    with open(path, 'ab') as f:
+        f.write(lines[52][15:])
+    complete = load_dataset(str(path))
+    assert complete.rows == 52
+    assert complete.previous_version == grown.version
+    assert complete.version == file_hash(str(path))
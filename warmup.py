@@ -0,0 +1,66 @@
+import logging
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_state = {'thread': None}
+_lock = threading.Lock()
+
+
+def run():
+    # Loads what the first visitors would otherwise wait for: the Condition catalog, the data,
+    # SQLite store and cube, Plotly with the default Home view's figures, and the page images
+    start = time.perf_counter()
+    import catalog
+
+    catalog.conditions()
+
+    import charts
+    from aggregates import get_cube
+    from backends import open_dataset
+    from filter_engine import FilterSpec, filter_rows
+
+    dataset = open_dataset()
+    cube = get_cube(dataset)
+    if cube.conditions and cube.genders:
+        # Same spec the Home page starts with: full age range, first gender and condition
+        spec = FilterSpec.home((float(cube.age_min), float(cube.age_max)), cube.genders[0], cube.conditions[0])
+        summary = cube.query(spec.age_range, spec.value('Gender'), spec.value('Condition'))
+        if not summary.empty:
+            charts.recovery_bar(dataset, spec, summary.drug_recovery())
+            charts.side_effect_pie(dataset, spec, summary.side_effect_counts())
+        frame = filter_rows(dataset, spec)
+        if not frame.empty:
+            charts.age_recovery_scatter(dataset, spec, frame)
+    import assets
+    import content
+
+    for path in content.image_paths():
+        assets.image(path)
+    logger.info("warm-up finished in %.2fs", time.perf_counter() - start)
+
+
+def _run():
+    try:
+        run()
+    except Exception:
+        logger.exception("warm-up failed; pages will load on demand")
+
+
+def start():
+    # Starts run() once per process on a background thread; no session ever waits for it
+    if not config.WARMUP or _state['thread'] is not None:
+        return
+    with _lock:
+        if _state['thread'] is None:
+            _state['thread'] = threading.Thread(target=_run, name='dashboard-warmup', daemon=True)
+            _state['thread'].start()
+
+
+if __name__ == '__main__':
+    # python warmup.py   fill the on-disk caches (catalog, store, image variants) before deploying
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    run()